@@ -1,8 +1,9 @@
 import os
-import json
 from typing import Dict, Any, List
 import anthropic
+import httpx
 from dotenv import load_dotenv
+import json_utils
 
 load_dotenv('./.env')
 
@@ -16,6 +17,16 @@ class ClaudeClient:
         self.model = "claude-sonnet-4-20250514"
         self.temperature = 0.0  # Zero temperature for consistent output
     
+    def create_async_client(self, max_retries: int = 2) -> anthropic.AsyncAnthropic:
+        """Create an async Claude client for concurrent requests (use it within a single event loop)"""
+        # HTTP/2 multiplexes concurrent batch requests over a few pooled connections
+        http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(120.0),
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        )
+        return anthropic.AsyncAnthropic(api_key=self.api_key, http_client=http_client, max_retries=max_retries)
+    
     def generate_pydantic_models(self, field_config: Dict[str, Any]) -> str:
         """Generate Pydantic models based on field configuration"""
         
@@ -31,7 +42,7 @@ DESCRIPTION CONTEXT: {description}
 Use the above context to understand the domain and purpose when generating models.
 
 Field Configuration:
-{json.dumps(field_config, indent=2)}
+{json_utils.dumps(field_config, indent=True)}
 
 CRITICAL FIELD NAMING REQUIREMENTS:
 1. Convert all field names from the configuration to snake_case format
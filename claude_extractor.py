@@ -1,8 +1,18 @@
 import os
-import json
+import re
+import copy
 import time
-from typing import Dict, Any, Type, List
+import hashlib
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Any, Type, List, Optional, Tuple
+import anthropic
+import json_utils
 from claude_client import ClaudeClient
+from response_cache import ResponseCache
+from fallback_data import create_fallback_data
+from rate_limiter import AdaptiveConcurrencyLimiter, backoff_delay, parse_retry_after, seconds_until
 from dotenv import load_dotenv
 import logging
 
@@ -11,10 +21,33 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Claude returns extractions as the input of this forced tool call, so no JSON text needs parsing
+_EXTRACTION_TOOL_NAME = "record_extraction"
+
+# Recover the purpose and document type from the structured instruction built by the UI
+_PURPOSE_RE = re.compile(r"The purpose of this extraction task is (.+?)\. Therefore, the document should be related to")
+_DOC_TYPE_RE = re.compile(r"Therefore, the document should be related to (.+?)\. Do not attempt")
+
+# Rough token estimate used for truncation; English text averages about four characters per token
+_CHARS_PER_TOKEN = 4
+_TRUNCATION_MARKER = "\n\n[... truncated ...]\n\n"
+
+@lru_cache(maxsize=32)
+def _extraction_tool(model_class: Type) -> Dict[str, Any]:
+    """Build the extraction tool definition from a model's JSON schema once per class"""
+    return {
+        "name": _EXTRACTION_TOOL_NAME,
+        "description": "Record the information extracted from the document.",
+        "input_schema": model_class.model_json_schema()
+    }
+
 class ClaudeExtractor:
     """Claude AI powered data extraction"""
     
-    def __init__(self, model_selection='claude-sonnet-4-20250514'):
+    def __init__(self, model_selection='claude-sonnet-4-20250514', max_concurrency: int = 8, 
+                 prompt_cache_ttl: str = None, use_cache: bool = True, 
+                 cache_dir: str = '.cache/claude_responses', validate_output: bool = True, 
+                 max_input_tokens: int = 150000):
         self.claude_client = ClaudeClient()
         self.model_selection = model_selection
         # Set the model on the claude client
@@ -23,12 +56,165 @@ class ClaudeExtractor:
         
         self.max_tokens = 4000
         self.temperature = 0.0  # Zero temperature for maximum consistency
+        self.max_concurrency = max_concurrency  # Concurrent Claude requests during batch extraction
+        self.max_attempts = 5  # Attempts per request for connection errors, rate limits and 5xx responses
+        self.prompt_cache_ttl = prompt_cache_ttl  # e.g. "1h" for long batches; default is the 5 minute cache
+        # Responses are reproducible at zero temperature, so identical requests can be served from disk
+        self.response_cache = ResponseCache(cache_dir) if use_cache else None
+        # When False the generated model only shapes the prompt and Claude's JSON is returned as-is
+        self.validate_output = validate_output
+        # Upper bound on prompt tokens per request; longer documents keep only their head and tail (None disables)
+        self.max_input_tokens = max_input_tokens
     
     def extract_data(self, document_content: str, extraction_prompt: str, 
                     model_class: Type, document_metadata: Dict[str, Any], 
                     additional_instructions: str = "") -> Dict[str, Any]:
         """Extract structured data from document using Claude AI"""
         
+        static_prompt = self._build_static_prompt(extraction_prompt, additional_instructions)
+        document_prompt = self._build_document_prompt(document_content, document_metadata, static_prompt)
+        cache_key = self._cache_key(static_prompt, document_prompt, model_class)
+        
+        try:
+            cached_data = self._get_cached_response(cache_key, document_metadata)
+            if cached_data is not None:
+                return self._process_extraction(cached_data, model_class, document_metadata)
+            
+            logger.info(f"Extracting data from document: {document_metadata.get('file_name', 'Unknown')}")
+            start_time = time.time()
+            
+            response = self._create_with_retries(self._request_params(static_prompt, document_prompt, model_class))
+            
+            elapsed_time = time.time() - start_time
+            logger.info(f"Claude extraction completed in {elapsed_time:.2f} seconds")
+            
+            return self._process_extraction(self._tool_input(response), model_class, document_metadata, cache_key)
+                
+        except Exception as e:
+            logger.error(f"Error extracting data from {document_metadata.get('file_name')}: {e}")
+            # Return fallback data structure
+            return self._create_fallback_data(model_class, document_metadata, str(e))
+    
+    async def extract_data_async(self, document_content: str, extraction_prompt: str, 
+                                 model_class: Type, document_metadata: Dict[str, Any], 
+                                 additional_instructions: str = "", 
+                                 async_client=None) -> Dict[str, Any]:
+        """Extract structured data from document using Claude AI without blocking the event loop"""
+        
+        if async_client is None:
+            async with self.claude_client.create_async_client(max_retries=0) as async_client:
+                return await self.extract_data_async(document_content, extraction_prompt, model_class, 
+                                                     document_metadata, additional_instructions, async_client)
+        
+        static_prompt = self._build_static_prompt(extraction_prompt, additional_instructions)
+        limiter = AdaptiveConcurrencyLimiter(self.max_concurrency)
+        return await self._extract_async(async_client, limiter, static_prompt, document_content, model_class, document_metadata)
+    
+    async def _extract_async(self, async_client, limiter: AdaptiveConcurrencyLimiter, static_prompt: Tuple[str, ...], 
+                             document_content: str, model_class: Type, 
+                             document_metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one document to Claude reusing a prebuilt (cacheable) static prompt"""
+        
+        document_prompt = self._build_document_prompt(document_content, document_metadata, static_prompt)
+        cache_key = self._cache_key(static_prompt, document_prompt, model_class)
+        
+        try:
+            cached_data = self._get_cached_response(cache_key, document_metadata)
+            if cached_data is not None:
+                return self._process_extraction(cached_data, model_class, document_metadata)
+            
+            logger.info(f"Extracting data from document: {document_metadata.get('file_name', 'Unknown')}")
+            start_time = time.time()
+            
+            response = await self._send_with_limits(async_client, limiter, self._request_params(static_prompt, document_prompt, model_class))
+            
+            elapsed_time = time.time() - start_time
+            logger.info(f"Claude extraction completed in {elapsed_time:.2f} seconds")
+            
+            return self._process_extraction(self._tool_input(response), model_class, document_metadata, cache_key)
+                
+        except Exception as e:
+            logger.error(f"Error extracting data from {document_metadata.get('file_name')}: {e}")
+            # Return fallback data structure
+            return self._create_fallback_data(model_class, document_metadata, str(e))
+    
+    def _create_with_retries(self, params: Dict[str, Any]):
+        """Call messages.create, retrying transient failures with exponential backoff and jitter"""
+        # Retries are handled here, so the SDK's own retry loop is disabled to avoid multiplying attempts
+        client = self.claude_client.client.with_options(max_retries=0)
+        
+        for attempt in range(self.max_attempts):
+            try:
+                return client.messages.create(**params)
+            except Exception as e:
+                if not self._is_retryable(e) or attempt == self.max_attempts - 1:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                logger.warning(f"Claude request failed ({e}), retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_attempts})")
+                time.sleep(delay)
+    
+    async def _send_with_limits(self, async_client, limiter: AdaptiveConcurrencyLimiter, params: Dict[str, Any]):
+        """Send a request through the adaptive limiter, retrying transient failures with backoff and jitter"""
+        for attempt in range(self.max_attempts):
+            async with limiter:
+                try:
+                    raw_response = await async_client.messages.with_raw_response.create(**params)
+                except Exception as e:
+                    if not self._is_retryable(e) or attempt == self.max_attempts - 1:
+                        raise
+                    retry_error = e
+                else:
+                    retry_error = None
+            
+            if retry_error is None:
+                await limiter.record_success(*self._rate_limit_budget(raw_response.headers))
+                return raw_response.parse()
+            
+            delay = self._retry_delay(retry_error, attempt)
+            logger.warning(f"Claude request failed ({retry_error}), retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_attempts})")
+            if isinstance(retry_error, anthropic.RateLimitError):
+                # The limiter pauses every request, not just this one, and shrinks concurrency
+                await limiter.record_rate_limited(delay)
+            else:
+                await asyncio.sleep(delay)
+    
+    def _is_retryable(self, error: Exception) -> bool:
+        """Check whether a Claude API error is transient"""
+        if isinstance(error, (anthropic.APIConnectionError, anthropic.RateLimitError)):
+            return True
+        return isinstance(error, anthropic.APIStatusError) and error.status_code >= 500
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Get the wait before retrying, honouring Retry-After on rate limit errors"""
+        delay = backoff_delay(attempt)
+        if isinstance(error, anthropic.RateLimitError):
+            return parse_retry_after(error.response.headers, default=delay)
+        return delay
+    
+    def _rate_limit_budget(self, headers) -> Tuple[Optional[float], Optional[float]]:
+        """Get the tightest remaining share of the request/token rate limits and when it resets"""
+        remaining_ratio = None
+        reset_after = None
+        
+        for kind in ("requests", "tokens"):
+            try:
+                remaining = float(headers.get(f"anthropic-ratelimit-{kind}-remaining"))
+                limit = float(headers.get(f"anthropic-ratelimit-{kind}-limit"))
+            except (TypeError, ValueError):
+                continue
+            if limit <= 0:
+                continue
+            
+            ratio = remaining / limit
+            if remaining_ratio is None or ratio < remaining_ratio:
+                remaining_ratio = ratio
+                reset_after = seconds_until(headers.get(f"anthropic-ratelimit-{kind}-reset"))
+        
+        return remaining_ratio, reset_after
+    
+    def _build_static_prompt(self, extraction_prompt: str, additional_instructions: str) -> Tuple[str, str]:
+        """Build the prompt sections that are identical for every document, most stable first"""
+        
         # Parse additional instructions to extract context components
         extraction_purpose, document_type, custom_instructions = self._parse_additional_instructions(additional_instructions)
         
@@ -47,151 +233,381 @@ class ClaudeExtractor:
         if custom_instructions.strip():
             context_sections.append(f"\nCUSTOM/ADDITIONAL EXTRACTION INSTRUCTIONS:\n{custom_instructions}\n")
         
-        full_prompt = f"""
-
-Extract the required information considering the context of EXTRACTION TASK, purpose of extraction, document type, and the EXTRACTION RULES. 
+        # The generated extraction prompt (task, embedded models, rules) only changes with the use case,
+        # so it comes first and stays cached when the per-run context and instructions change
+        instructions = f"""
+Extract the required information considering the context of EXTRACTION TASK, purpose of extraction, document type, and the EXTRACTION RULES above. 
 Return the extracted information as a valid JSON object that matches the specified schema.
 Ensure all required fields are included and follow the exact field names and types specified.
 
 {''.join(context_sections)}
-{extraction_prompt}
-
-IMPORTANT: Return ONLY the JSON object, no additional text, explanations, or markdown formatting.
-
-================================================
-
-Document to analyze:
+IMPORTANT: Return the extracted object by calling the {_EXTRACTION_TOOL_NAME} tool, with no additional text or explanations.
+"""
+        return extraction_prompt.strip(), instructions
+    
+    def _build_document_prompt(self, document_content: str, document_metadata: Dict[str, Any], 
+                               static_prompt: Tuple[str, ...] = ()) -> str:
+        """Build the per-document part of the prompt"""
+        document_content = self._truncate_content(document_content, document_metadata, static_prompt)
+        return f"""Document to analyze:
 Filename: {document_metadata.get('file_name', 'Unknown')}
 Content:
 {document_content}
 """
+    
+    def _truncate_content(self, document_content: str, document_metadata: Dict[str, Any], static_prompt: Tuple[str, ...]) -> str:
+        """Keep the head and tail of documents that would exceed the input token budget"""
+        if not self.max_input_tokens:
+            return document_content
+        
+        # Character-based estimate keeps this local; the API's count_tokens would cost a request per document
+        budget_tokens = self.max_input_tokens - sum(map(len, static_prompt)) // _CHARS_PER_TOKEN
+        budget_chars = max(0, budget_tokens) * _CHARS_PER_TOKEN
+        if len(document_content) <= budget_chars:
+            return document_content
+        
+        keep_chars = max(0, budget_chars - len(_TRUNCATION_MARKER)) // 2
+        logger.warning(f"Truncating {document_metadata.get('file_name', 'Unknown')} from ~{len(document_content) // _CHARS_PER_TOKEN} "
+                       f"to ~{budget_tokens} tokens (keeping the beginning and end)")
+        if keep_chars == 0:
+            return _TRUNCATION_MARKER.strip()
+        return document_content[:keep_chars] + _TRUNCATION_MARKER + document_content[-keep_chars:]
+    
+    def _request_params(self, static_prompt: Tuple[str, ...], document_prompt: str, model_class: Type) -> Dict[str, Any]:
+        """Build the Claude messages.create parameters, caching each static prompt section"""
+        cache_control = {"type": "ephemeral"}
+        if self.prompt_cache_ttl:
+            cache_control["ttl"] = self.prompt_cache_ttl
+        
+        return {
+            "model": self.claude_client.model,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            # Forcing the extraction tool makes Claude return the fields as already-parsed tool input
+            "tools": [_extraction_tool(model_class)],
+            "tool_choice": {"type": "tool", "name": _EXTRACTION_TOOL_NAME},
+            # Static sections go in the system prompt, each with its own cache breakpoint, so Claude can
+            # reuse the cached prefix across documents and across runs that only change the instructions
+            "system": [{"type": "text", "text": section, "cache_control": cache_control}
+                       for section in static_prompt if section],
+            "messages": [{"role": "user", "content": document_prompt}]
+        }
+    
+    def _cache_key(self, static_prompt: Tuple[str, ...], document_prompt: str, model_class: Type) -> str:
+        """Build the response cache key for a request"""
+        return ResponseCache.make_key(
+            self.claude_client.model, self.temperature, *static_prompt, document_prompt, model_class.__name__
+        )
+    
+    def _get_cached_response(self, cache_key: str, document_metadata: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the cached extraction for the request, if caching is enabled and it exists"""
+        if self.response_cache is None:
+            return None
+        cached_text = self.response_cache.get(cache_key)
+        if cached_text is None:
+            return None
         
         try:
-            logger.info(f"Extracting data from document: {document_metadata.get('file_name', 'Unknown')}")
-            start_time = time.time()
-            
-            response = self.claude_client.client.messages.create(
-                model=self.claude_client.model,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                messages=[{"role": "user", "content": full_prompt}]
-            )
-            
-            elapsed_time = time.time() - start_time
-            logger.info(f"Claude extraction completed in {elapsed_time:.2f} seconds")
-            
-            # Parse the JSON response - Claude might wrap JSON in code blocks
-            response_text = response.content[0].text.strip()
-            
-            # Remove markdown code blocks if present
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]  # Remove ```json
-            elif response_text.startswith('```'):
-                response_text = response_text[3:]   # Remove ```
-            
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]  # Remove trailing ```
-            
-            response_text = response_text.strip()
+            cached_data = json_utils.loads(cached_text)
+        except json_utils.JSONDecodeError:
+            logger.warning(f"Ignoring unreadable cache entry for {document_metadata.get('file_name', 'Unknown')}")
+            return None
+        
+        logger.info(f"Using cached Claude response for {document_metadata.get('file_name', 'Unknown')}")
+        return cached_data
+    
+    def _tool_input(self, message) -> Dict[str, Any]:
+        """Get the extracted fields from the extraction tool call in a Claude response"""
+        for block in message.content:
+            if block.type == "tool_use" and block.name == _EXTRACTION_TOOL_NAME:
+                return block.input
+        raise ValueError(f"Claude response did not include a {_EXTRACTION_TOOL_NAME} tool call (stop reason: {message.stop_reason})")
+    
+    def _process_extraction(self, extracted_json: Dict[str, Any], model_class: Type, document_metadata: Dict[str, Any], 
+                            cache_key: str = None) -> Dict[str, Any]:
+        """Cache and validate the fields Claude extracted"""
+        self._cache_response(cache_key, extracted_json)
+        
+        if not self.validate_output:
+            return extracted_json
+        
+        # Validate and create model instance
+        try:
+            model_instance = model_class.model_validate(extracted_json)
+            logger.info(f"Successfully created model instance for {document_metadata.get('file_name')}")
+            return model_instance.model_dump()
+        
+        except Exception as validation_error:
+            logger.warning(f"Validation error for {document_metadata.get('file_name')}: {validation_error}")
+            # Return raw JSON if validation fails
+            return extracted_json
+    
+    def _cache_response(self, cache_key: str, extracted_json: Dict[str, Any]) -> None:
+        """Store an extraction so identical requests are served from disk on the next run"""
+        if cache_key and self.response_cache is not None:
+            self.response_cache.set(cache_key, json_utils.dumps(extracted_json))
+    
+    def extract_batch(self, documents: List[Dict[str, Any]], extraction_prompt: str, 
+                     model_class: Type, additional_instructions: str = "", 
+                     mode: str = "realtime") -> List[Dict[str, Any]]:
+        """Extract data from multiple documents using Claude ("realtime" requests or an offline "batch" job)"""
+        if mode == "batch":
+            return self.extract_batch_offline(documents, extraction_prompt, model_class, additional_instructions)
+        if mode != "realtime":
+            raise ValueError(f"Unsupported extraction mode: {mode}")
+        return asyncio.run(self.extract_batch_async(documents, extraction_prompt, model_class, additional_instructions))
+    
+    def extract_batch_offline(self, documents: List[Dict[str, Any]], extraction_prompt: str, 
+                              model_class: Type, additional_instructions: str = "", 
+                              poll_interval: float = 30.0) -> List[Dict[str, Any]]:
+        """Extract data from multiple documents as one Message Batches API job (half price, results can take hours)"""
+        
+        total_docs = len(documents)
+        logger.info(f"Starting offline batch extraction for {total_docs} documents using Claude")
+        
+        static_prompt = self._build_static_prompt(extraction_prompt, additional_instructions)
+        groups = self._group_duplicate_documents(documents)
+        group_results = [None] * len(groups)
+        pending = {}  # custom_id -> (group position, cache key)
+        requests = []
+        
+        for position, indices in enumerate(groups.values()):
+            doc = documents[indices[0]]
+            document_prompt = self._build_document_prompt(doc['text_content'], doc, static_prompt)
+            cache_key = self._cache_key(static_prompt, document_prompt, model_class)
             
-            # Parse the JSON response
-            extracted_json = json.loads(response_text)
+            cached_data = self._get_cached_response(cache_key, doc)
+            if cached_data is not None:
+                group_results[position] = self._process_extraction(cached_data, model_class, doc)
+                continue
             
-            # Validate and create model instance
+            # custom_id only allows [a-zA-Z0-9_-], so results are routed back by position rather than file name
+            custom_id = f"doc-{position}"
+            pending[custom_id] = (position, cache_key)
+            requests.append({"custom_id": custom_id, "params": self._request_params(static_prompt, document_prompt, model_class)})
+        
+        if requests:
             try:
-                model_instance = model_class(**extracted_json)
-                logger.info(f"Successfully created model instance for {document_metadata.get('file_name')}")
-                return model_instance.model_dump()
-            
-            except Exception as validation_error:
-                logger.warning(f"Validation error for {document_metadata.get('file_name')}: {validation_error}")
-                # Return raw JSON if validation fails
-                return extracted_json
+                client = self.claude_client.client
+                batch = client.messages.batches.create(requests=requests)
+                logger.info(f"Submitted Claude message batch {batch.id} with {len(requests)} requests")
                 
-        except json.JSONDecodeError as json_error:
-            logger.error(f"JSON parsing failed for document {document_metadata.get('file_name', 'Unknown')}")
-            logger.error(f"Raw response: {response.content[0].text}")
-            logger.error(f"Cleaned response: {response_text}")
+                while batch.processing_status != "ended":
+                    time.sleep(poll_interval)
+                    batch = client.messages.batches.retrieve(batch.id)
+                    logger.info(f"Claude message batch {batch.id} is {batch.processing_status} "
+                                f"({batch.request_counts.succeeded} succeeded, {batch.request_counts.errored} errored)")
+                
+                group_indices = list(groups.values())
+                for entry in client.messages.batches.results(batch.id):
+                    if entry.custom_id not in pending:
+                        continue
+                    position, cache_key = pending[entry.custom_id]
+                    doc = documents[group_indices[position][0]]
+                    
+                    # Failures are stored as exceptions, so _fan_out_results records them as extraction errors
+                    if entry.result.type == "succeeded":
+                        try:
+                            group_results[position] = self._process_extraction(
+                                self._tool_input(entry.result.message), model_class, doc, cache_key
+                            )
+                        except Exception as e:
+                            # e.g. a message that stopped at max_tokens before calling the tool
+                            group_results[position] = e
+                    else:
+                        error_detail = getattr(entry.result, 'error', None)
+                        logger.error(f"Batch request {entry.result.type} for {doc.get('file_name')}: {error_detail}")
+                        group_results[position] = RuntimeError(f"Batch request {entry.result.type}: {error_detail}")
+                    # Popped only once the entry is handled, so anything left over gets an error below
+                    del pending[entry.custom_id]
+
+                for position, _ in pending.values():
+                    group_results[position] = RuntimeError("No result returned by batch")
+
+            except Exception as e:
+                logger.error(f"Claude message batch failed: {e}")
+                for position, _ in pending.values():
+                    group_results[position] = e
+        
+        results = self._fan_out_results(documents, groups, group_results, model_class)
+        
+        logger.info(f"Claude offline batch extraction completed. Processed {len(results)} documents")
+        return results
+    
+    async def extract_batch_async(self, documents: List[Dict[str, Any]], extraction_prompt: str, 
+                                  model_class: Type, additional_instructions: str = "") -> List[Dict[str, Any]]:
+        """Extract data from multiple documents concurrently using Claude"""
+        
+        total_docs = len(documents)
+        # Starts at max_concurrency, halves on rate limit errors and grows back as requests succeed
+        limiter = AdaptiveConcurrencyLimiter(self.max_concurrency)
+        
+        # Built once per batch so every request shares the same cacheable prefix
+        static_prompt = self._build_static_prompt(extraction_prompt, additional_instructions)
+        
+        # Identical documents are extracted once and the result is copied to every occurrence
+        groups = self._group_duplicate_documents(documents)
+        unique_docs = len(groups)
+        
+        logger.info(f"Starting batch extraction for {total_docs} documents ({unique_docs} unique) using Claude "
+                    f"(max concurrency: {self.max_concurrency})")
+        
+        async with self.claude_client.create_async_client(max_retries=0) as async_client:
             
-            # Return fallback data structure with error info
-            return self._create_fallback_data(model_class, document_metadata, f"JSON parsing failed: {str(json_error)}")
+            async def extract_document(i: int, doc: Dict[str, Any]) -> Dict[str, Any]:
+                logger.info(f"Processing document {i}/{unique_docs}: {doc.get('file_name')}")
+                
+                return await self._extract_async(
+                    async_client=async_client,
+                    limiter=limiter,
+                    static_prompt=static_prompt,
+                    document_content=doc['text_content'],
+                    model_class=model_class,
+                    document_metadata=doc
+                )
             
-        except Exception as e:
-            logger.error(f"Error extracting data from {document_metadata.get('file_name')}: {e}")
-            # Return fallback data structure
-            return self._create_fallback_data(model_class, document_metadata, str(e))
+            # return_exceptions keeps one failing document from cancelling the rest of the batch
+            outcomes = await asyncio.gather(
+                *(extract_document(i, documents[indices[0]]) for i, indices in enumerate(groups.values(), 1)),
+                return_exceptions=True
+            )
+        
+        results = self._fan_out_results(documents, groups, outcomes, model_class)
+        
+        logger.info(f"Claude batch extraction completed. Processed {len(results)} documents")
+        return results
     
-    def extract_batch(self, documents: List[Dict[str, Any]], extraction_prompt: str, 
-                     model_class: Type, additional_instructions: str = "") -> List[Dict[str, Any]]:
-        """Extract data from multiple documents using Claude"""
+    def extract_directory(self, directory_path: str, extraction_prompt: str, model_class: Type, 
+                          additional_instructions: str = "", document_parser=None) -> List[Dict[str, Any]]:
+        """Parse and extract every supported document in a directory, overlapping parsing with extraction"""
+        if document_parser is None:
+            from document_parser import DocumentParser
+            document_parser = DocumentParser()
         
-        results = []
-        total_docs = len(documents)
+        file_paths = document_parser.list_supported_files(directory_path)
+        return asyncio.run(self.extract_files_async(
+            file_paths, extraction_prompt, model_class, additional_instructions, document_parser
+        ))
+    
+    async def extract_files_async(self, file_paths: List[str], extraction_prompt: str, model_class: Type, 
+                                  additional_instructions: str = "", document_parser=None, 
+                                  max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Parse files in a process pool and send each one to Claude as soon as it has been parsed"""
+        if document_parser is None:
+            from document_parser import DocumentParser
+            document_parser = DocumentParser()
+        
+        loop = asyncio.get_running_loop()
+        # Parsers wait for room in this queue before taking the next file, so parsing can't run arbitrarily far
+        # ahead of extraction: at most maxsize parsed documents wait here plus one per parser
+        queue = asyncio.Queue(maxsize=2 * self.max_concurrency)
+        parser_count = max(1, min(len(file_paths), max_workers or os.cpu_count() or 1))
+        pending_files = iter(enumerate(file_paths))
+        limiter = AdaptiveConcurrencyLimiter(self.max_concurrency)
+        static_prompt = self._build_static_prompt(extraction_prompt, additional_instructions)
+        results = {}  # file index -> extraction result
+        consumer_count = self.max_concurrency
         
-        logger.info(f"Starting batch extraction for {total_docs} documents using Claude")
+        logger.info(f"Starting pipelined extraction for {len(file_paths)} files using Claude")
         
-        for i, doc in enumerate(documents, 1):
-            logger.info(f"Processing document {i}/{total_docs}: {doc.get('file_name')}")
+        async def produce(pool: ProcessPoolExecutor) -> None:
+            async def parse() -> None:
+                # The parsers share one iterator, so each file is taken by exactly one of them
+                for index, file_path in pending_files:
+                    try:
+                        doc = await loop.run_in_executor(pool, document_parser.parse_document, file_path)
+                    except Exception as e:
+                        logger.error(f"Failed to parse {os.path.basename(file_path)}: {e}")
+                        results[index] = self._parse_failure_result(model_class, file_path, str(e))
+                        continue
+                    await queue.put((index, doc))
             
             try:
-                extracted_data = self.extract_data(
+                await asyncio.gather(*(parse() for _ in range(parser_count)))
+            finally:
+                # One sentinel per consumer so they all stop once parsing is done
+                for _ in range(consumer_count):
+                    await queue.put(None)
+        
+        async def consume(async_client) -> None:
+            while (item := await queue.get()) is not None:
+                index, doc = item
+                logger.info(f"Processing document: {doc.get('file_name')}")
+                
+                extracted_data = await self._extract_async(
+                    async_client=async_client,
+                    limiter=limiter,
+                    static_prompt=static_prompt,
                     document_content=doc['text_content'],
-                    extraction_prompt=extraction_prompt,
                     model_class=model_class,
-                    document_metadata=doc,
-                    additional_instructions=additional_instructions
+                    document_metadata=doc
                 )
                 
                 # Add document metadata to results
-                extracted_data['_document_metadata'] = {
-                    'file_name': doc['file_name'],
-                    'file_path': doc['file_path'],
-                    'content_length': doc['content_length'],
-                    'word_count': doc['word_count']
-                }
+                extracted_data['_document_metadata'] = self._document_metadata(doc)
+                results[index] = extracted_data
+        
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            async with self.claude_client.create_async_client(max_retries=0) as async_client:
+                await asyncio.gather(produce(pool), *(consume(async_client) for _ in range(consumer_count)))
+        
+        logger.info(f"Claude pipelined extraction completed. Processed {len(results)} documents")
+        return [results[index] for index in sorted(results)]
+    
+    def _parse_failure_result(self, model_class: Type, file_path: str, error_message: str) -> Dict[str, Any]:
+        """Fallback result for a file that couldn't be parsed, so it still gets a row"""
+        doc = {'file_name': os.path.basename(file_path), 'file_path': file_path, 'content_length': 0, 'word_count': 0}
+        extracted_data = self._create_fallback_data(model_class, doc, error_message)
+        extracted_data['_document_metadata'] = self._document_metadata(doc, error_message)
+        return extracted_data
+    
+    def _group_duplicate_documents(self, documents: List[Dict[str, Any]]) -> Dict[bytes, List[int]]:
+        """Group document indices by a hash of their text content, in order of first occurrence"""
+        groups = {}
+        for index, doc in enumerate(documents):
+            digest = hashlib.blake2b(doc['text_content'].encode('utf-8'), digest_size=16).digest()
+            groups.setdefault(digest, []).append(index)
+        return groups
+    
+    def _fan_out_results(self, documents: List[Dict[str, Any]], groups: Dict[bytes, List[int]], 
+                         group_results: List[Any], model_class: Type) -> List[Dict[str, Any]]:
+        """Copy each group's extraction result to all of its documents and attach their metadata"""
+        results = [None] * len(documents)
+        
+        for indices, outcome in zip(groups.values(), group_results):
+            for index in indices:
+                doc = documents[index]
                 
-                results.append(extracted_data)
+                if isinstance(outcome, BaseException):
+                    logger.error(f"Failed to process document {doc.get('file_name')}: {outcome}")
+                    # Add fallback result
+                    extracted_data = self._create_fallback_data(model_class, doc, str(outcome))
+                    extracted_data['_document_metadata'] = self._document_metadata(doc, str(outcome))
+                else:
+                    extracted_data = outcome if index == indices[0] else copy.deepcopy(outcome)
+                    # Add document metadata to results
+                    extracted_data['_document_metadata'] = self._document_metadata(doc)
                 
-            except Exception as e:
-                logger.error(f"Failed to process document {doc.get('file_name')}: {e}")
-                # Add fallback result
-                fallback_data = self._create_fallback_data(model_class, doc, str(e))
-                fallback_data['_document_metadata'] = {
-                    'file_name': doc['file_name'],
-                    'file_path': doc['file_path'],
-                    'content_length': doc['content_length'],
-                    'word_count': doc['word_count'],
-                    'extraction_error': str(e)
-                }
-                results.append(fallback_data)
+                results[index] = extracted_data
         
-        logger.info(f"Claude batch extraction completed. Processed {len(results)} documents")
         return results
     
+    def _document_metadata(self, doc: Dict[str, Any], extraction_error: str = None) -> Dict[str, Any]:
+        """Build the document metadata attached to each batch result"""
+        metadata = {
+            'file_name': doc['file_name'],
+            'file_path': doc['file_path'],
+            'content_length': doc['content_length'],
+            'word_count': doc['word_count']
+        }
+        if extraction_error is not None:
+            metadata['extraction_error'] = extraction_error
+        return metadata
+    
     def _create_fallback_data(self, model_class: Type, document_metadata: Dict[str, Any], error_message: str = None) -> Dict[str, Any]:
         """Create fallback data when extraction fails"""
         try:
-            # Try to create a minimal instance with default values
-            model_fields = model_class.model_fields
-            fallback_data = {}
-            
-            for field_name, field_info in model_fields.items():
-                if hasattr(field_info, 'default') and field_info.default is not None:
-                    fallback_data[field_name] = field_info.default
-                else:
-                    # Provide basic fallback based on type
-                    if 'str' in str(field_info.annotation):
-                        fallback_data[field_name] = "n/a"
-                    elif 'int' in str(field_info.annotation):
-                        fallback_data[field_name] = 0
-                    elif 'float' in str(field_info.annotation):
-                        fallback_data[field_name] = 0.0
-                    elif 'bool' in str(field_info.annotation):
-                        fallback_data[field_name] = False
-                    elif 'List' in str(field_info.annotation):
-                        fallback_data[field_name] = []
-                    else:
-                        fallback_data[field_name] = "n/a"
+            fallback_data = create_fallback_data(model_class)
             
             if error_message:
                 fallback_data['error'] = error_message
@@ -222,9 +638,8 @@ Content:
             # Check if this block contains the structured purpose/document type instruction
             if "The purpose of this extraction task is" in block and "Therefore, the document should be related to" in block:
                 # Extract purpose and document type from the structured instruction
-                import re
-                purpose_match = re.search(r"The purpose of this extraction task is (.+?)\. Therefore, the document should be related to", block)
-                doc_type_match = re.search(r"Therefore, the document should be related to (.+?)\. Do not attempt", block)
+                purpose_match = _PURPOSE_RE.search(block)
+                doc_type_match = _DOC_TYPE_RE.search(block)
                 
                 if purpose_match:
                     extraction_purpose = purpose_match.group(1).strip()
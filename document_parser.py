@@ -1,31 +1,92 @@
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
 import fitz  # PyMuPDF
 from docx import Document
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Plain text extraction without ligature preservation (ligatures are expanded, e.g. "ﬁ" -> "fi");
+# keeps the default whitespace handling and clipping to the page's media box
+_PDF_TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+
+# Document path -> ((mtime_ns, size), parsed document), most recently used last
+_PARSED_DOCUMENTS: "OrderedDict[str, Tuple[Tuple[int, int], Dict[str, Any]]]" = OrderedDict()
+_PARSED_DOCUMENTS_LOCK = threading.Lock()  # Streamlit sessions parse from separate threads
+
+# Number of parsed documents kept in memory for reuse
+_MAX_CACHED_DOCUMENTS = 256
+
+
+def _source_stat(file_path: str) -> Optional[Tuple[int, int]]:
+    """Modification time and size identifying the current version of a file, or None if it can't be stat'ed"""
+    try:
+        file_stat = os.stat(file_path)
+    except OSError:
+        return None
+    return file_stat.st_mtime_ns, file_stat.st_size
+
+
+def _get_parsed_document(file_path: str, source_stat: Optional[Tuple[int, int]]) -> Optional[Dict[str, Any]]:
+    """Return a copy of the cached parse of this version of the file, if there is one"""
+    if source_stat is None:
+        return None
+    with _PARSED_DOCUMENTS_LOCK:
+        cached = _PARSED_DOCUMENTS.get(os.path.abspath(file_path))
+        if cached is None or cached[0] != source_stat:
+            return None
+        _PARSED_DOCUMENTS.move_to_end(os.path.abspath(file_path))
+    # The path is reported as the caller gave it
+    return {**cached[1], 'file_path': file_path}
+
+
+def _store_parsed_document(file_path: str, source_stat: Optional[Tuple[int, int]], parsed_document: Dict[str, Any]) -> None:
+    """Cache a parse under the file version it was read from"""
+    if source_stat is None:
+        return
+    with _PARSED_DOCUMENTS_LOCK:
+        # A copy, so callers modifying the document they were given don't change the cache
+        _PARSED_DOCUMENTS[os.path.abspath(file_path)] = (source_stat, dict(parsed_document))
+        _PARSED_DOCUMENTS.move_to_end(os.path.abspath(file_path))
+        if len(_PARSED_DOCUMENTS) > _MAX_CACHED_DOCUMENTS:
+            _PARSED_DOCUMENTS.popitem(last=False)
+
 class DocumentParser:
     """Open-source document parser for PDF and Word documents"""
     
     def __init__(self):
         self.supported_extensions = ['.pdf', '.docx', '.doc']
     
+    @contextmanager
+    def open_pdf(self, file_path: str):
+        """Open a PDF once for repeated page access, closing it on exit"""
+        doc = fitz.open(file_path)
+        try:
+            yield doc
+        finally:
+            doc.close()
+    
+    def get_pdf_text(self, doc, page_numbers: Optional[Iterable[int]] = None) -> str:
+        """Extract text from an already open PDF, optionally restricted to some pages"""
+        pages = doc if page_numbers is None else (doc[page_number] for page_number in page_numbers)
+        text_parts = []
+        
+        for page in pages:
+            text_parts.append(page.get_text("text", flags=_PDF_TEXT_FLAGS))
+            text_parts.append("\n\n")  # Add page separator
+        
+        return "".join(text_parts).strip()
+    
     def parse_pdf(self, file_path: str) -> str:
         """Parse PDF file and extract text content"""
         try:
-            doc = fitz.open(file_path)
-            text_content = ""
-            
-            for page_num in range(doc.page_count):
-                page = doc[page_num]
-                text_content += page.get_text()
-                text_content += "\n\n"  # Add page separator
-            
-            doc.close()
-            return text_content.strip()
+            with self.open_pdf(file_path) as doc:
+                return self.get_pdf_text(doc)
             
         except Exception as e:
             logger.error(f"Error parsing PDF {file_path}: {e}")
@@ -35,24 +96,26 @@ class DocumentParser:
         """Parse DOCX file and extract text content"""
         try:
             doc = Document(file_path)
-            text_content = ""
+            text_lines = []
             
             # Extract text from paragraphs
             for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text_content += paragraph.text + "\n"
+                paragraph_text = paragraph.text
+                if paragraph_text.strip():
+                    text_lines.append(paragraph_text)
             
             # Extract text from tables
             for table in doc.tables:
                 for row in table.rows:
                     row_text = []
                     for cell in row.cells:
-                        if cell.text.strip():
-                            row_text.append(cell.text.strip())
+                        cell_text = cell.text.strip()
+                        if cell_text:
+                            row_text.append(cell_text)
                     if row_text:
-                        text_content += " | ".join(row_text) + "\n"
+                        text_lines.append(" | ".join(row_text))
             
-            return text_content.strip()
+            return "\n".join(text_lines).strip()
             
         except Exception as e:
             logger.error(f"Error parsing DOCX {file_path}: {e}")
@@ -91,12 +154,12 @@ class DocumentParser:
             'word_count': len(text_content.split()) if text_content else 0
         }
     
-    def parse_directory(self, directory_path: str) -> List[Dict[str, Any]]:
-        """Parse all supported documents in a directory"""
+    def list_supported_files(self, directory_path: str) -> List[str]:
+        """List the paths of supported documents in a directory"""
         if not os.path.exists(directory_path):
             raise FileNotFoundError(f"Directory not found: {directory_path}")
         
-        parsed_documents = []
+        file_paths = []
         
         for file_name in os.listdir(directory_path):
             file_path = os.path.join(directory_path, file_name)
@@ -105,12 +168,59 @@ class DocumentParser:
                 file_extension = os.path.splitext(file_name)[1].lower()
                 
                 if file_extension in self.supported_extensions:
-                    try:
-                        parsed_doc = self.parse_document(file_path)
-                        parsed_documents.append(parsed_doc)
-                    except Exception as e:
-                        logger.error(f"Failed to parse {file_name}: {e}")
-                        continue
+                    file_paths.append(file_path)
+        
+        return file_paths
+    
+    def iter_parse_documents(self, file_paths: List[str], max_workers: Optional[int] = None) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[Exception]]]:
+        """Parse documents in a process pool since parsing is CPU-bound, yielding (index, parsed document, error) as each one finishes"""
+        # Files unchanged since an earlier parse in this process are served from the cache; only the rest are parsed
+        pending = []
+        for index, file_path in enumerate(file_paths):
+            source_stat = _source_stat(file_path)
+            cached = _get_parsed_document(file_path, source_stat)
+            if cached is not None:
+                yield index, cached, None
+            else:
+                pending.append((index, file_path, source_stat))
+        
+        if len(pending) <= 1 or max_workers == 1:
+            for index, file_path, source_stat in pending:
+                try:
+                    parsed_document = self.parse_document(file_path)
+                except Exception as e:
+                    yield index, None, e
+                    continue
+                _store_parsed_document(file_path, source_stat, parsed_document)
+                yield index, parsed_document, None
+            return
+        
+        # Processes rather than threads: PyMuPDF holds the GIL and isn't safe to use from several threads
+        with ProcessPoolExecutor(max_workers=min(len(pending), max_workers or os.cpu_count() or 1)) as pool:
+            futures = {pool.submit(self.parse_document, file_path): (index, file_path, source_stat) for index, file_path, source_stat in pending}
+            for future in as_completed(futures):
+                index, file_path, source_stat = futures[future]
+                try:
+                    parsed_document = future.result()
+                except Exception as e:
+                    yield index, None, e
+                    continue
+                _store_parsed_document(file_path, source_stat, parsed_document)
+                yield index, parsed_document, None
+    
+    def parse_directory(self, directory_path: str, max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Parse all supported documents in a directory, using a process pool since parsing is CPU-bound"""
+        file_paths = self.list_supported_files(directory_path)
+        parsed_slots = [None] * len(file_paths)
+        
+        for index, parsed_document, error in self.iter_parse_documents(file_paths, max_workers):
+            if error is not None:
+                logger.error(f"Failed to parse {os.path.basename(file_paths[index])}: {error}")
+            else:
+                parsed_slots[index] = parsed_document
+        
+        # Slots keep the directory listing order whatever order the documents finished in
+        parsed_documents = [parsed_document for parsed_document in parsed_slots if parsed_document is not None]
         
         logger.info(f"Successfully parsed {len(parsed_documents)} documents from {directory_path}")
         return parsed_documents
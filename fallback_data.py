@@ -0,0 +1,44 @@
+import copy
+import types
+from typing import Any, Dict, Type, Union, get_args, get_origin
+
+_UNION_TYPES = (Union, getattr(types, 'UnionType', Union))  # X | Y unions are types.UnionType on Python 3.10+
+_LIST_TYPES = (list, set, tuple, frozenset)
+
+
+def fallback_value(annotation: Any) -> Any:
+    """Get the placeholder value for a field type"""
+    origin = get_origin(annotation)
+    if origin in _UNION_TYPES:
+        # Optional[X] falls back like X
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return fallback_value(args[0]) if args else "n/a"
+    if origin in _LIST_TYPES or annotation in _LIST_TYPES:
+        return []
+    if annotation is bool:
+        return False
+    if annotation is int:
+        return 0
+    if annotation is float:
+        return 0.0
+    return "n/a"
+
+
+def build_fallback_template(model_class: Type) -> Dict[str, Any]:
+    """Build the fallback values for a model class from its field defaults and types"""
+    template = {}
+    for field_name, field_info in model_class.model_fields.items():
+        default = None if field_info.is_required() else field_info.get_default(call_default_factory=True)
+        template[field_name] = default if default is not None else fallback_value(field_info.annotation)
+    return template
+
+
+def create_fallback_data(model_class: Type) -> Dict[str, Any]:
+    """Return a fresh copy of the model's fallback values, building and storing the template on first use"""
+    # Looked up on the class itself so a subclass never reuses its parent's template
+    template = vars(model_class).get('__fallback_template__')
+    if template is None:
+        template = build_fallback_template(model_class)
+        model_class.__fallback_template__ = template
+    # Copied so callers can't mutate the shared defaults
+    return copy.deepcopy(template)
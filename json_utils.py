@@ -0,0 +1,31 @@
+import json
+from typing import Any, Callable, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup
+    orjson = None
+
+# orjson.JSONDecodeError subclasses this, so callers can catch one type for both backends
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data) -> Any:
+    """Parse JSON from str, bytes or a memoryview using orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def dumps_bytes(obj: Any, indent: bool = False, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """Serialize to UTF-8 encoded JSON, optionally indented by two spaces"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_INDENT_2 if indent else None)
+    return json.dumps(obj, indent=2 if indent else None, default=default, ensure_ascii=False).encode('utf-8')
+
+
+def dumps(obj: Any, indent: bool = False, default: Optional[Callable[[Any], Any]] = None) -> str:
+    """Serialize to a JSON string, optionally indented by two spaces"""
+    return dumps_bytes(obj, indent=indent, default=default).decode('utf-8')
@@ -1,34 +1,215 @@
 import json
 import os
+import mmap
 import re
-import tempfile
-import importlib.util
 import sys
-from typing import Dict, Any, Type
-from pathlib import Path
+import types
+import asyncio
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple, Type
 import logging
-from pydantic import BaseModel
-from claude_client import ClaudeClient
-from openai_client import OpenAIClient
+import json_utils
+from response_cache import ResponseCache
+from fallback_data import build_fallback_template
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Config files larger than this are memory-mapped rather than read into memory
+_MMAP_CONFIG_THRESHOLD = 1 << 20  # 1 MB
+
+# Saved model file path -> name of the module it was last loaded into
+_LOADED_MODEL_MODULES: Dict[str, str] = {}
+
+# Saved prompt file path -> ((mtime_ns, size), extracted prompt)
+_LOADED_PROMPTS: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+# Number of built model classes kept in memory for reuse
+_MAX_CACHED_MODEL_CLASSES = 64
+
+# Patterns used while cleaning generated code, compiled once at import
+_RE_CODE_BLOCK = re.compile(r'```(?:python)?[ \t]*\n(.*?)```', re.DOTALL | re.IGNORECASE)
+_RE_FENCE_TRAIL = re.compile(r'```[a-zA-Z]*\n?')
+_RE_DESCRIPTION = re.compile(r'description="([^"]*(?:\\"[^"]*)*)"')
+_RE_ENUM_SPLIT = re.compile(r'[,/&\-\s]+')
+_RE_ENUM_CLEAN = re.compile(r'[^A-Z0-9_]')
+_RE_PROMPT_BLOCK = re.compile(r'EXTRACTION_PROMPT = """(.*?)"""', re.DOTALL)
+
+# Line filter for unfenced responses: explanation openers, and the starts and keywords of lines kept as code
+_PROSE_PREFIXES = ('Here is', 'Here\'s', 'The following', 'This is', 'Below is',
+                   'This code', 'The code', 'Above', 'Note:', 'Example:')
+_CODE_PREFIXES = ('from ', 'import ', 'class ', 'def ', '    ', '@', 'if ', 'try:', 'except:')
+_CODE_KEYWORDS = ('=', ':', 'Field', 'Enum', 'BaseModel')
+
+# Common Unicode characters and their ASCII-compatible equivalents, applied in one str.translate pass
+_UNICODE_TRANSLATION = str.maketrans({
+    '\u2011': '-',  # Non-breaking hyphen → regular hyphen
+    '\u2013': '-',  # En dash → regular hyphen
+    '\u2014': '-',  # Em dash → regular hyphen
+    '\u2018': "'",  # Left single quotation mark → apostrophe
+    '\u2019': "'",  # Right single quotation mark → apostrophe
+    '\u201C': '"',  # Left double quotation mark → quote
+    '\u201D': '"',  # Right double quotation mark → quote
+    '\u00A0': ' ',  # Non-breaking space → regular space
+    '\u2026': '...',  # Horizontal ellipsis → three dots
+})
+
+# Special cases for common enum value patterns
+_ENUM_SPECIAL_MAPPINGS = {
+    "Healthcare & wellbeing": "HEALTHCARE",
+    "Cultural & creative industries": "CULTURAL",
+    "Education & training": "EDUCATION", 
+    "Environment & sustainability": "ENVIRONMENT",
+    "Smart cities": "SMART_CITIES",
+    "Transport, mobility, logistics": "TRANSPORT",
+    "Travel & tourism": "TRAVEL",
+    "Business development/business services": "BUSINESS",
+    "Real estate & property": "REAL_ESTATE",
+    "Arts & entertainment": "ARTS",
+    "Computer vision & image processing": "COMPUTER_VISION",
+    "Rule-based systems": "RULE_BASED",
+    "Generative AI": "GENERATIVE_AI",
+    "Machine learning": "MACHINE_LEARNING",
+    "Predictive analytics": "PREDICTIVE_ANALYTICS"
+}
+
+# Common words ignored when deriving enum member names
+_ENUM_IGNORE_WORDS = frozenset({'&', 'and', 'or', 'the', 'of', 'for', 'in', 'on', 'at', 'to', 'a', 'an'})
+
+@lru_cache(maxsize=4096)
+def _intelligent_enum_name(enum_value: str) -> str:
+    """Create a readable enum member name, cached since enum vocabularies repeat across fields and configs"""
+    # Check for exact matches first
+    special_name = _ENUM_SPECIAL_MAPPINGS.get(enum_value)
+    if special_name:
+        return special_name
+    
+    # General algorithm for other values
+    # Extract key words (ignore common words), splitting by various delimiters
+    words = [token for token in _RE_ENUM_SPLIT.split(enum_value) if token and token.lower() not in _ENUM_IGNORE_WORDS]
+    
+    # Always include first token even if short, then only numbers and meaningful words
+    words = words[:1] + [word for word in words[1:] if word.isdigit() or len(word) > 2]
+    
+    if not words:
+        words = [enum_value.split()[0] if enum_value.split() else "VALUE"]  # Ultimate fallback
+    
+    # Create enum name
+    enum_name = '_'.join(word.upper() for word in words)
+    
+    # Clean up the name
+    enum_name = _RE_ENUM_CLEAN.sub('', enum_name)
+    
+    # Ensure it starts with a letter
+    if enum_name and enum_name[0].isdigit():
+        enum_name = 'OPTION_' + enum_name
+    
+    if not enum_name:
+        enum_name = 'OTHER'
+        
+    return enum_name
+
+
+# Extraction prompt with embedded models, filled in with str.format by _create_static_extraction_prompt
+_STATIC_EXTRACTION_PROMPT_TEMPLATE = """TASK: {use_case}
+
+EXTRACTION TASK:
+{description}
+
+EMBEDDED PYDANTIC MODELS:
+```python
+{model_code}
+```
+
+CRITICAL EXTRACTION RULES:
+1. ACCURACY & VERIFICATION:
+   - Extract information ONLY from the provided text
+   - Never fabricate, infer, or guess any information
+   - Use 'n/a' for any fields where information is not explicitly stated
+   - Verify all extracted data against the source text
+   - Maintain exact values, dates, and numerical figures as written
+
+2. DATA HANDLING:
+   - For dates: Use DD-MM-YYYY format when possible
+   - For numbers: Preserve original precision and units
+   - For text: Maintain original spelling and capitalization
+   - For lists: Extract all relevant items, remove duplicates
+   - For enums: Choose ONLY from the specified options
+   - For the extracted fields whose length exceeds 30 words, summarize their text into less than 30 words comprising very brief key phrases separated by semi-colon.
+
+3. FIELD VALIDATION:
+   - Enum fields must match one of the specified values exactly
+   - List fields should contain valid, non-empty items
+   - Numerical fields should be valid numbers in correct format
+
+4. QUALITY ASSURANCE:
+   - Double-check all extracted information against source
+   - Ensure no information is duplicated across fields
+   - Verify that field types match the expected data types
+   - Confirm that all required fields are addressed
+   - Validate that enum selections are from available options
+
+
+OUTPUT FORMAT:
+Return the extracted information as a JSON object that exactly matches the {main_model_name} structure shown above.
+
+CRITICAL: All JSON field names MUST be in snake_case format (lowercase with underscores) to match the model exactly.
+For example: "due_date", "bank_name", "car_type" - NOT "Due date", "bank name", "car type"
+
+Example output structure:
+```json
+{{
+  "field_name_1": "extracted_value_or_n/a",
+  "field_name_2": ["list", "of", "values"],
+  "field_name_3": "enum_option_or_n/a"
+}}
+```
+
+VALIDATION CHECKLIST:
+Before returning your response, verify:
+- All required fields are populated or marked 'n/a'
+- All enum fields contain valid options only
+- All numerical fields contain valid numbers
+- All date fields follow proper format
+- No information is fabricated or inferred
+- JSON structure matches the model exactly
+- Field names match the model exactly
+- Data types are appropriate for each field
+
+FINAL INSTRUCTIONS:
+- Process the document systematically
+- Extract information field by field as specified above
+- Maintain accuracy over completeness
+- When in doubt, use 'n/a' rather than guessing
+- Return only the JSON object with extracted data
+- Ensure the output can be parsed as valid JSON"""
+
 class ModelGenerator:
     """Dynamic Pydantic model generator using Claude AI or OpenAI"""
     
-    def __init__(self, model_selection='claude-3-5-sonnet-20241022', api_config=None):
+    def __init__(self, model_selection='claude-3-5-sonnet-20241022', api_config=None,
+                 use_cache: bool = True, cache_dir: str = '.cache/model_generator'):
         self.model_selection = model_selection
         self.api_config = api_config
+        self.model_code_cache = ResponseCache(cache_dir, suffix='.py') if use_cache else None
+        self._model_classes = OrderedDict()  # (main model name, code hash) -> model class built in this process
         self.claude_client = None
         self.openai_client = None
         
         # Initialize the appropriate client based on model selection
-        if 'claude' in model_selection.lower():
+        # Import lazily so only the selected provider's SDK gets loaded
+        self._backend = 'Claude' if 'claude' in model_selection.lower() else 'OpenAI'
+        if self._backend == 'Claude':
+            from claude_client import ClaudeClient
             self.claude_client = ClaudeClient()
+            self._generate_pydantic_models = self.claude_client.generate_pydantic_models
         else:
             # For OpenAI models, use centralized OpenAI client
+            from openai_client import OpenAIClient
             self.openai_client = OpenAIClient(api_config=api_config)
+            self._generate_pydantic_models = self.openai_client.generate_pydantic_models
         
         self.generated_models = {}
         self.extraction_prompt = ""
@@ -36,24 +217,59 @@ class ModelGenerator:
     def load_field_config(self, config_path: str) -> Dict[str, Any]:
         """Load field configuration from JSON file"""
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+            # Read bytes so orjson can decode UTF-8 itself when it is installed
+            with open(config_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size > _MMAP_CONFIG_THRESHOLD:
+                    # Parse large configs straight from the page cache instead of copying them into memory
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                        config = json_utils.loads(view)
+                else:
+                    config = json_utils.loads(f.read())
             return config['extraction_config']
         except Exception as e:
             logger.error(f"Error loading field config: {e}")
             raise
     
-    def generate_models_from_config(self, config_path: str) -> tuple[Type, str]:
-        """Generate Pydantic models from configuration file"""
+    def generate_models_from_config(self, config_path: str, refresh: bool = False) -> tuple[Type, str]:
+        """Generate Pydantic models from configuration file (refresh skips the model code cache)"""
         field_config = self.load_field_config(config_path)
-        return self._generate_models_from_field_config(field_config)
+        return self._generate_models_from_field_config(field_config, refresh)
     
-    def generate_models_from_config_data(self, config_data: Dict[str, Any]) -> tuple[Type, str]:
-        """Generate Pydantic models from configuration data directly"""
+    def generate_models_from_config_data(self, config_data: Dict[str, Any], refresh: bool = False) -> tuple[Type, str]:
+        """Generate Pydantic models from configuration data directly (refresh skips the model code cache)"""
         field_config = config_data['extraction_config']
-        return self._generate_models_from_field_config(field_config)
+        return self._generate_models_from_field_config(field_config, refresh)
+    
+    def generate_models_from_configs(self, config_paths: List[str], max_concurrency: int = 8) -> List[Tuple[Type, str, str]]:
+        """Generate models for several configuration files concurrently"""
+        return asyncio.run(self.generate_models_from_configs_async(config_paths, max_concurrency))
     
-    def _generate_models_from_field_config(self, field_config: Dict[str, Any]) -> tuple[Type, str]:
+    async def generate_models_from_configs_async(self, config_paths: List[str], max_concurrency: int = 8) -> List[Tuple[Type, str, str]]:
+        """Generate models for several configuration files, returning (model class, model code, extraction prompt) per file"""
+        field_configs = [self.load_field_config(config_path) for config_path in config_paths]
+        return await self.generate_models_from_field_configs_async(field_configs, max_concurrency)
+    
+    async def generate_models_from_field_configs_async(self, field_configs: List[Dict[str, Any]], max_concurrency: int = 8) -> List[Tuple[Type, str, str]]:
+        """Generate models for several field configs with at most max_concurrency LLM calls in flight"""
+        semaphore = asyncio.Semaphore(max_concurrency)
+        return await asyncio.gather(*(self._generate_models_async(field_config, semaphore) for field_config in field_configs))
+    
+    async def _generate_models_async(self, field_config: Dict[str, Any], semaphore: asyncio.Semaphore) -> Tuple[Type, str, str]:
+        """Run the blocking LLM call in a worker thread, then build the models on the event loop"""
+        logger.info(f"Generating models for use case: {field_config['use_case']}")
+        
+        async with semaphore:
+            try:
+                model_code, from_cache = await asyncio.to_thread(self._generate_model_code, field_config)
+                model_class, model_code = self._build_models(field_config, model_code, from_cache)
+            except Exception as e:
+                logger.warning(f"{self._backend} model generation failed: {e}. Using fallback model generation.")
+                model_class, model_code = self._build_fallback_models(field_config)
+        
+        # Building runs without awaiting, so the prompt still belongs to this config
+        return model_class, model_code, self.extraction_prompt
+    
+    def _generate_models_from_field_config(self, field_config: Dict[str, Any], refresh: bool = False) -> tuple[Type, str]:
         
         # Store config for later use in prompt generation
         self.current_field_config = field_config
@@ -61,128 +277,55 @@ class ModelGenerator:
         logger.info(f"Generating models for use case: {field_config['use_case']}")
         
         try:
-            # Generate Pydantic model code using selected model
-            if self.claude_client:
-                model_code = self.claude_client.generate_pydantic_models(field_config)
-            else:
-                model_code = self.openai_client.generate_pydantic_models(field_config)
-            
-            # Generate extraction prompt using static template with embedded models
-            self.extraction_prompt = self._create_static_extraction_prompt(field_config, model_code)
-            
-            # Save and import the generated model
-            main_model_class = self._create_model_from_code(model_code, field_config['main_model_name'])
-            
-            return main_model_class, model_code
+            model_code, from_cache = self._generate_model_code(field_config, refresh)
+            return self._build_models(field_config, model_code, from_cache)
             
         except Exception as e:
-            model_name = "Claude" if self.claude_client else "OpenAI"
-            logger.warning(f"{model_name} model generation failed: {e}. Using fallback model generation.")
+            logger.warning(f"{self._backend} model generation failed: {e}. Using fallback model generation.")
             
             # Fallback to manual model generation
-            model_code = self._create_fallback_model(field_config)
-            self.extraction_prompt = self._create_static_extraction_prompt(field_config, model_code)
-            
-            main_model_class = self._create_model_from_code(model_code, field_config['main_model_name'])
-            
-            return main_model_class, model_code
+            return self._build_fallback_models(field_config)
     
-    def _generate_with_openai(self, field_config: Dict[str, Any]) -> str:
-        """Generate Pydantic models using OpenAI"""
-        use_case = field_config.get('use_case', 'Document Analysis')
-        description = field_config.get('description', 'Extract structured information from documents')
+    def _generate_model_code(self, field_config: Dict[str, Any], refresh: bool = False) -> Tuple[str, bool]:
+        """Get model code from the cache or the selected LLM, returning (code, from_cache)"""
+        # A refresh always asks the LLM; the fresh code then replaces the cached entry
+        use_cache = self.model_code_cache is not None and not refresh
+        model_code = self.model_code_cache.get(self._model_cache_key(field_config)) if use_cache else None
+        if model_code is not None:
+            logger.info(f"Using cached model code for use case: {field_config['use_case']}")
+            return model_code, True
+        
+        # Generate Pydantic model code using selected model
+        return self._generate_pydantic_models(field_config), False
+    
+    def _build_models(self, field_config: Dict[str, Any], model_code: str, from_cache: bool) -> tuple[Type, str]:
+        """Create the extraction prompt and model class for generated model code"""
+        # Generate extraction prompt using static template with embedded models
+        self.extraction_prompt = self._create_static_extraction_prompt(field_config, model_code)
         
-        prompt = f"""
-You are an expert Python developer specializing in Pydantic models. Based on the provided field configuration, generate complete Pydantic models with proper imports, enums, and validation.
-
-USE CASE CONTEXT: {use_case}
-DESCRIPTION CONTEXT: {description}
-
-Use the above context to understand the domain and purpose when generating models.
-
-Field Configuration:
-{json.dumps(field_config, indent=2)}
-
-CRITICAL FIELD NAMING REQUIREMENTS:
-1. Convert all field names from the configuration to snake_case format
-2. Replace spaces and hyphens with underscores, convert to lowercase
-3. DO NOT use field aliases - the Python field names must match the JSON keys exactly
-4. This ensures the extracted JSON can be validated without field name mismatches
-
-Requirements:
-1. Generate all necessary imports at the top
-2. Create enum classes ONLY for fields with enum_values (skip if enum_values is null)
-3. Create the main Pydantic model class with snake_case field names
-4. Use proper type hints (str, int, float, bool, List[enum], etc.)
-5. Use field descriptions exactly as provided - do not modify or optimize them
-6. Add field validators for list fields where needed
-7. Handle both single enums and list[enum] types properly
-8. Use proper enum inheritance (str, Enum)
-9. Consider the use case context when structuring the models
-10. NEVER use aliases - use consistent snake_case field names throughout
-
-IMPORTANT: 
-- Use field descriptions exactly as provided in the configuration
-- Generate ONLY clean Python code with no markdown formatting
-- All field names must be snake_case to match JSON output
-
-Example structure:
-```python
-from pydantic import BaseModel, Field, field_validator
-from enum import Enum
-from typing import List, Optional
-
-class Domain(str, Enum):
-    HEALTHCARE = "Healthcare & wellbeing"
-    AUTOMOTIVE = "Automotive"
-    CONSTRUCTION = "Construction"
-    MANUFACTURING = "Manufacturing"
-    FINANCE = "Finance"
-
-class AiField(str, Enum):
-    GENERATIVE_AI = "Generative AI"
-    MACHINE_LEARNING = "Machine learning"
-    COMPUTER_VISION = "Computer vision & image processing"
-
-class MainModel(BaseModel):
-    company_name: str = Field(..., description="The name of the company")
-    domain: Domain = Field(..., description="The primary industry domain")
-    ai_field: AiField = Field(..., description="The primary AI field")
-    confidence: float = Field(..., ge=0.0, le=1.0, description="Confidence score")
-```
-
-CRITICAL ENUM NAMING RULES:
-1. Use clear, readable enum member names (HEALTHCARE, not HEALTHCAREW)
-2. Keep enum names concise but descriptive
-3. Use UPPER_CASE with underscores for multi-word concepts
-4. Map readable names to full descriptive values
-5. Never truncate or abbreviate enum member names randomly
-
-Make sure all enum values are properly formatted and all field types are correct based on the configuration.
-"""
+        main_model_class = self._create_model_from_code(model_code, field_config['main_model_name'])
         
-        try:
-            response = self.openai_client.chat.completions.create(
-                model=self.model_selection,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are an expert Python developer. Generate clean, well-structured Pydantic models based on the provided specifications."
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
-                max_tokens=4000,
-                temperature=0.0
-            )
-            
-            return response.choices[0].message.content
-            
-        except Exception as e:
-            logger.error(f"OpenAI model generation failed: {e}")
-            raise
+        # Only cache code that produced a working model
+        if not from_cache and self.model_code_cache:
+            self.model_code_cache.set(self._model_cache_key(field_config), model_code)
+        
+        return main_model_class, model_code
+    
+    def _build_fallback_models(self, field_config: Dict[str, Any]) -> tuple[Type, str]:
+        """Create the extraction prompt and model class from the manual fallback model"""
+        model_code = self._create_fallback_model(field_config)
+        self.extraction_prompt = self._create_static_extraction_prompt(field_config, model_code)
+        
+        main_model_class = self._create_model_from_code(model_code, field_config['main_model_name'])
+        
+        return main_model_class, model_code
+    
+    def _model_cache_key(self, field_config: Dict[str, Any]) -> str:
+        """Build a cache key from the canonical field config and the generating model"""
+        # created_at is stamped on every export and doesn't change the models
+        canonical_fields = {key: value for key, value in field_config.items() if key != 'created_at'}
+        canonical_config = json.dumps(canonical_fields, sort_keys=True, separators=(',', ':'))
+        return ResponseCache.make_key(self.model_selection, canonical_config)
     
     def _create_model_from_code(self, model_code: str, main_model_name: str) -> Type:
         """Create Pydantic model class from generated code"""
@@ -190,40 +333,57 @@ Make sure all enum values are properly formatted and all field types are correct
             # Clean the generated code
             cleaned_code = self._clean_generated_code(model_code)
             
-            logger.info(f"Generated model code:\n{cleaned_code}")
-            
-            # Create a temporary file with the generated code
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-                f.write(cleaned_code)
-                temp_file_path = f.name
-            
-            # Test if the code is syntactically valid
-            try:
-                with open(temp_file_path, 'r') as f:
-                    compile(f.read(), temp_file_path, 'exec')
-            except SyntaxError as syntax_error:
-                logger.error(f"Syntax error in generated code: {syntax_error}")
-                logger.error(f"Generated code:\n{cleaned_code}")
-                # Try to fix common issues and regenerate
-                raise Exception(f"Invalid Python syntax in generated model code: {syntax_error}")
-            
-            # Import the module from the temporary file
-            spec = importlib.util.spec_from_file_location("generated_models", temp_file_path)
-            generated_module = importlib.util.module_from_spec(spec)
-            sys.modules["generated_models"] = generated_module
-            spec.loader.exec_module(generated_module)
+            # Reuse the class if identical code was already built in this process
+            code_hash = hashlib.blake2b(cleaned_code.encode('utf-8'), digest_size=16).hexdigest()
+            class_key = (main_model_name, code_hash)
+            main_model_class = self._model_classes.get(class_key)
+            if main_model_class is not None:
+                self._model_classes.move_to_end(class_key)
+                self.generated_models[main_model_name] = main_model_class
+                logger.info(f"Reusing model class built from identical code: {main_model_name}")
+                return main_model_class
+            
+            # Each distinct code gets its own module so earlier models stay importable
+            module_name = f"generated_models_{code_hash}"
+            generated_module = sys.modules.get(module_name)
+            
+            if generated_module is None or main_model_name not in generated_module.__dict__:
+                logger.info(f"Generated model code:\n{cleaned_code}")
+                
+                # Compile and execute the code in memory
+                try:
+                    code_obj = compile(cleaned_code, module_name, "exec")
+                except SyntaxError as syntax_error:
+                    logger.error(f"Syntax error in generated code at line {syntax_error.lineno}: {syntax_error}")
+                    numbered_code = '\n'.join(f"{number:4d}: {line}" for number, line in enumerate(cleaned_code.split('\n'), start=1))
+                    logger.error(f"Generated code:\n{numbered_code}")
+                    raise Exception(f"Invalid Python syntax in generated model code: {syntax_error}")
+                
+                generated_module = types.ModuleType(module_name)
+                sys.modules[module_name] = generated_module
+                try:
+                    exec(code_obj, generated_module.__dict__)
+                except BaseException:
+                    del sys.modules[module_name]
+                    raise
             
             # Get the main model class
-            main_model_class = getattr(generated_module, main_model_name)
+            try:
+                main_model_class = generated_module.__dict__[main_model_name]
+            except KeyError:
+                defined_names = [name for name in generated_module.__dict__ if not name.startswith('__')]
+                raise RuntimeError(f"Generated code did not define {main_model_name!r}; defined: {defined_names}")
+            self._register_model_class(main_model_class)
             
             # Store the generated models
             self.generated_models[main_model_name] = main_model_class
+            self._model_classes[class_key] = main_model_class
+            if len(self._model_classes) > _MAX_CACHED_MODEL_CLASSES:
+                (_, evicted_hash), _ = self._model_classes.popitem(last=False)
+                sys.modules.pop(f"generated_models_{evicted_hash}", None)
             
             logger.info(f"Successfully created model class: {main_model_name}")
             
-            # Clean up temporary file
-            Path(temp_file_path).unlink()
-            
             return main_model_class
             
         except Exception as e:
@@ -231,48 +391,23 @@ Make sure all enum values are properly formatted and all field types are correct
             logger.error(f"Generated code:\n{model_code}")
             raise
     
+    def _register_model_class(self, model_class: Type) -> None:
+        """Record on the class what extractors need per model: its fallback values"""
+        # Built once here instead of introspecting the fields on every failed extraction
+        model_class.__fallback_template__ = build_fallback_template(model_class)
+    
     def _clean_generated_code(self, code: str) -> str:
         """Clean the generated code to remove markdown formatting and fix common issues"""
-        import re
-        
-        # Step 1: Remove all markdown code blocks aggressively
-        # Remove ```python and ``` patterns
-        code = re.sub(r'```\s*python\s*\n?', '', code, flags=re.IGNORECASE)
-        code = re.sub(r'```\s*\n?', '', code)
-        
-        # Remove any remaining ``` patterns
-        code = code.replace('```python', '').replace('```', '')
-        
-        # Step 2: Process line by line to remove markdown and non-Python content
-        lines = code.split('\n')
-        cleaned_lines = []
-        
-        for line in lines:
-            # Skip empty lines at the beginning
-            if not cleaned_lines and not line.strip():
-                continue
-            
-            # Skip markdown code fence lines that might remain
-            if line.strip() in ['```', '```python', '```Python']:
-                continue
-                
-            # Skip lines that are clearly not Python code
-            if line.strip().startswith(('Here is', 'Here\'s', 'The following', 'This is', 'Below is', 
-                                       'This code', 'The code', 'Above', 'Note:', 'Example:')):
-                continue
-            
-            # Skip lines that look like markdown or explanations
-            if line.strip().startswith(('*', '-', '#')) and not any(keyword in line for keyword in ['=', 'Field', 'Enum', 'class', 'def']):
-                continue
-                
-            # Include lines that are clearly Python code
-            if (line.strip().startswith(('from ', 'import ', 'class ', 'def ', '    ', '@', 'if ', 'try:', 'except:')) or
-                (line.strip() and any(keyword in line for keyword in ['=', ':', 'Field', 'Enum', 'BaseModel'])) or
-                line.strip() == ''):  # Keep empty lines for formatting
-                cleaned_lines.append(line)
+        # Step 1: Take the fenced code blocks when the response has any
+        code_blocks = _RE_CODE_BLOCK.findall(code) if '```' in code else []
+        if code_blocks:
+            cleaned_code = '\n'.join(code_blocks)
+        else:
+            # Step 2: Remove stray fences, then keep only the lines that look like Python
+            cleaned_code = self._filter_code_lines(_RE_FENCE_TRAIL.sub('', code))
         
-        # Step 3: Join and final cleanup
-        cleaned_code = '\n'.join(cleaned_lines)
+        # Step 3: Drop surrounding blank lines
+        cleaned_code = cleaned_code.strip('\n')
         
         # Step 4: Fix string literals
         cleaned_code = self._fix_string_literals(cleaned_code)
@@ -285,15 +420,26 @@ Make sure all enum values are properly formatted and all field types are correct
         if 'from typing import' not in cleaned_code and ('List[' in cleaned_code or 'Optional[' in cleaned_code):
             cleaned_code = 'from typing import List, Optional\n' + cleaned_code
         
-        # Step 6: Remove any stray markdown that might remain
-        cleaned_code = re.sub(r'```[a-zA-Z]*\n?', '', cleaned_code)
-        
         return cleaned_code
     
+    def _filter_code_lines(self, code: str) -> str:
+        """Drop markdown and explanation lines, wherever they appear, from a response without code fences"""
+        cleaned_lines = []
+        for line in code.split('\n'):
+            stripped = line.strip()
+            # Skip empty lines at the beginning and lines that are clearly not Python code
+            if (not cleaned_lines and not stripped) or stripped.startswith(_PROSE_PREFIXES):
+                continue
+            # Skip lines that look like markdown or explanations
+            if stripped.startswith(('*', '-', '#')) and not any(keyword in line for keyword in ['=', 'Field', 'Enum', 'class', 'def']):
+                continue
+            # Include lines that are clearly Python code, and empty lines for formatting
+            if stripped.startswith(_CODE_PREFIXES) or not stripped or any(keyword in line for keyword in _CODE_KEYWORDS):
+                cleaned_lines.append(line)
+        return '\n'.join(cleaned_lines)
+    
     def _fix_string_literals(self, code: str) -> str:
         """Fix common string literal issues in generated code"""
-        import re
-        
         # Fix problematic description strings using repr() for proper escaping
         def fix_description(match):
             desc_content = match.group(1)
@@ -301,9 +447,8 @@ Make sure all enum values are properly formatted and all field types are correct
             fixed_content = desc_content.replace('\\"', '"').replace('\\\\', '\\')
             return f'description={repr(fixed_content)}'
         
-        # Pattern to match description="content" (with potential escaping)
-        pattern = r'description="([^"]*(?:\\"[^"]*)*)"'
-        code = re.sub(pattern, fix_description, code)
+        # Match description="content" (with potential escaping)
+        code = _RE_DESCRIPTION.sub(fix_description, code)
         
         return code
     
@@ -312,190 +457,67 @@ Make sure all enum values are properly formatted and all field types are correct
         if not text:
             return text
             
-        # Replace common Unicode characters with ASCII equivalents
-        replacements = {
-            '\u2011': '-',  # Non-breaking hyphen → regular hyphen
-            '\u2013': '-',  # En dash → regular hyphen
-            '\u2014': '-',  # Em dash → regular hyphen
-            '\u2018': "'",  # Left single quotation mark → apostrophe
-            '\u2019': "'",  # Right single quotation mark → apostrophe
-            '\u201C': '"',  # Left double quotation mark → quote
-            '\u201D': '"',  # Right double quotation mark → quote
-            '\u00A0': ' ',  # Non-breaking space → regular space
-            '\u2026': '...',  # Horizontal ellipsis → three dots
-        }
-        
-        normalized_text = text
-        for unicode_char, ascii_char in replacements.items():
-            normalized_text = normalized_text.replace(unicode_char, ascii_char)
-            
-        return normalized_text
+        return text.translate(_UNICODE_TRANSLATION)
     
     def _create_intelligent_enum_name(self, enum_value: str) -> str:
         """Create intelligent, readable enum member names"""
-        
-        # Special cases for common patterns
-        special_mappings = {
-            "Healthcare & wellbeing": "HEALTHCARE",
-            "Cultural & creative industries": "CULTURAL",
-            "Education & training": "EDUCATION", 
-            "Environment & sustainability": "ENVIRONMENT",
-            "Smart cities": "SMART_CITIES",
-            "Transport, mobility, logistics": "TRANSPORT",
-            "Travel & tourism": "TRAVEL",
-            "Business development/business services": "BUSINESS",
-            "Real estate & property": "REAL_ESTATE",
-            "Arts & entertainment": "ARTS",
-            "Computer vision & image processing": "COMPUTER_VISION",
-            "Rule-based systems": "RULE_BASED",
-            "Generative AI": "GENERATIVE_AI",
-            "Machine learning": "MACHINE_LEARNING",
-            "Predictive analytics": "PREDICTIVE_ANALYTICS"
-        }
-        
-        # Check for exact matches first
-        if enum_value in special_mappings:
-            return special_mappings[enum_value]
-        
-        # General algorithm for other values
-        # Extract key words (ignore common words)
-        ignore_words = {'&', 'and', 'or', 'the', 'of', 'for', 'in', 'on', 'at', 'to', 'a', 'an'}
-        words = []
-        
-        # Split by various delimiters
-        import re
-        tokens = re.split(r'[,/&\-\s]+', enum_value)
-        
-        for token in tokens:
-            clean_token = token.strip()
-            if clean_token and clean_token.lower() not in ignore_words:
-                # Include numbers and meaningful words
-                if clean_token.isdigit() or len(clean_token) > 2:
-                    words.append(clean_token)
-                elif len(words) == 0:  # Always include first token even if short
-                    words.append(clean_token)
-        
-        # Ensure we have at least some words
-        if not words:
-            # Fallback: take all non-ignored tokens
-            tokens = re.split(r'[,/&\-\s]+', enum_value)
-            words = [token.strip() for token in tokens if token.strip() and token.strip().lower() not in ignore_words]
-        
-        if not words:
-            words = [enum_value.split()[0] if enum_value.split() else "VALUE"]  # Ultimate fallback
-        
-        # Create enum name
-        enum_name = '_'.join(word.upper() for word in words)
-        
-        # Clean up the name
-        enum_name = re.sub(r'[^A-Z0-9_]', '', enum_name)
-        
-        # Ensure it starts with a letter
-        if enum_name and enum_name[0].isdigit():
-            enum_name = 'OPTION_' + enum_name
-        
-        if not enum_name:
-            enum_name = 'OTHER'
-            
-        return enum_name
+        return _intelligent_enum_name(enum_value)
     
     def _create_fallback_model(self, field_config: Dict[str, Any]) -> str:
         """Create a fallback Pydantic model when Claude generation fails"""
         
-        # Start with imports
-        model_code = [
-            "from pydantic import BaseModel, Field, field_validator",
-            "from enum import Enum", 
-            "from typing import List, Optional",
-            ""
-        ]
+        # Build all lines in one list, starting with imports
+        model_code = []
+        write = model_code.append
+        write("from pydantic import BaseModel, Field, field_validator")
+        write("from enum import Enum")
+        write("from typing import List, Optional")
+        write("")
         
-        # Create enum classes for fields that have enum_values (regardless of field_type)
-        enum_classes = []
-        for field in field_config.get('fields', []):
-            if field.get('enum_values') and len(field['enum_values']) > 0:
+        normalize = self._normalize_unicode_chars
+        enum_member_name = self._create_intelligent_enum_name
+        
+        # Single pass over the fields: enum classes are written directly, main model lines are collected
+        field_lines = []
+        for field in field_config.get('fields', ()):
+            original_field_name = field.get('field_name', '')
+            clean_field_name = original_field_name.replace(' ', '_').replace('-', '_')
+            field_type = field.get('field_type', 'str')
+            enum_values = field.get('enum_values')
+            required = field.get('required', True)
+            
+            # Map field types - auto-convert to enum if categories are provided
+            if enum_values:
                 # Clean enum name - remove "Enum" suffix and use field name
-                clean_field_name = field['field_name'].replace(' ', '_').replace('-', '_').title()
-                if clean_field_name.endswith('_Enum'):
-                    clean_field_name = clean_field_name[:-5]
-                enum_name = f"{clean_field_name}"
-                enum_class = [f"class {enum_name}(str, Enum):"]
+                enum_name = clean_field_name.title()
+                if enum_name.endswith('_Enum'):
+                    enum_name = enum_name[:-5]
+                
+                # Create enum classes for fields that have enum_values (regardless of field_type)
+                write(f"class {enum_name}(str, Enum):")
                 
                 # Handle both list of individual values and comma-separated strings
                 all_enum_values = []
-                for enum_value in field['enum_values']:
+                for enum_value in enum_values:
                     # Normalize Unicode characters to ASCII-compatible equivalents
-                    normalized_value = self._normalize_unicode_chars(enum_value)
+                    normalized_value = normalize(enum_value)
                     
-                    if ',' in normalized_value and len(field['enum_values']) == 1:
+                    if ',' in normalized_value and len(enum_values) == 1:
                         # This is a comma-separated string - split it intelligently
-                        # Handle special cases where commas are part of the value name
-                        parts = []
-                        current_part = ""
-                        
-                        # Split by comma but handle special cases
-                        tokens = normalized_value.split(',')
-                        i = 0
-                        while i < len(tokens):
-                            token = tokens[i].strip()
-                            
-                            # Check for multi-word values that should stay together
-                            if (token.lower() in ['transport'] and i + 2 < len(tokens) and 
-                                tokens[i+1].strip().lower() == 'mobility' and 
-                                tokens[i+2].strip().lower() == 'logistics'):
-                                # Combine "Transport, mobility, logistics" into one value
-                                parts.append(f"{token}, {tokens[i+1].strip()}, {tokens[i+2].strip()}")
-                                i += 3
-                            elif (token.lower().startswith('business development') and i + 1 < len(tokens)):
-                                # Combine "Business development/business services"
-                                parts.append(f"{token}, {tokens[i+1].strip()}")
-                                i += 2
-                            else:
-                                parts.append(token)
-                                i += 1
-                        
-                        all_enum_values.extend([part for part in parts if part])
+                        all_enum_values.extend(part for part in self._split_enum_string(normalized_value) if part)
                     else:
                         # This is already a proper individual value
                         all_enum_values.append(normalized_value)
                 
                 # Generate enum entries with intelligent naming
                 for enum_value in all_enum_values:
-                    # Create intelligent enum member names
-                    safe_name = self._create_intelligent_enum_name(enum_value)
-                    enum_class.append(f'    {safe_name} = "{enum_value}"')
+                    write(f'    {enum_member_name(enum_value)} = "{enum_value}"')
+                write("")
                 
-                enum_classes.extend(enum_class)
-                enum_classes.append("")
-        
-        model_code.extend(enum_classes)
-        
-        # Create main model class
-        main_model_name = field_config.get('main_model_name', 'GeneratedModel')
-        model_code.append(f"class {main_model_name}(BaseModel):")
-        
-        for field in field_config.get('fields', []):
-            original_field_name = field.get('field_name', '')
-            # Always use snake_case for field names to avoid alias issues
-            field_name = original_field_name.replace(' ', '_').replace('-', '_').lower()
-            field_type = field.get('field_type', 'str')
-            description = self._normalize_unicode_chars(field.get('description', ''))
-            required = field.get('required', True)
-            
-            # Map field types - auto-convert to enum if categories are provided
-            if field.get('enum_values') and len(field['enum_values']) > 0:
-                # Use same naming convention as enum class generation
-                clean_field_name = field['field_name'].replace(' ', '_').replace('-', '_').title()
-                if clean_field_name.endswith('_Enum'):
-                    clean_field_name = clean_field_name[:-5]
-                enum_name = f"{clean_field_name}"
-                if field_type == 'list[enum]' or (field_type == 'list[str]' and field.get('enum_values')):
-                    type_hint = f"List[{enum_name}]"
-                else:
-                    type_hint = enum_name
+                type_hint = f"List[{enum_name}]" if field_type in ('list[enum]', 'list[str]') else enum_name
             elif field_type == 'list[str]':
                 type_hint = "List[str]"
-            elif field_type in ['int', 'float', 'bool']:
+            elif field_type in ('int', 'float', 'bool'):
                 type_hint = field_type
             else:
                 type_hint = "str"
@@ -504,16 +526,46 @@ Make sure all enum values are properly formatted and all field types are correct
                 type_hint = f"Optional[{type_hint}]"
             
             default_value = "..." if required else "None"
+            description = normalize(field.get('description', ''))
             
-            # Use repr() to properly escape the description string
-            description_repr = repr(description)
-            
-            # Generate field WITHOUT alias - use consistent snake_case names
-            # This ensures extracted JSON keys match the model field names exactly
-            model_code.append(f'    {field_name}: {type_hint} = Field({default_value}, description={description_repr})')
+            # Always use snake_case field names WITHOUT alias so extracted JSON keys match the model exactly
+            # repr() properly escapes the description string
+            field_lines.append(f'    {clean_field_name.lower()}: {type_hint} = Field({default_value}, description={description!r})')
+        
+        # Create main model class
+        main_model_name = field_config.get('main_model_name', 'GeneratedModel')
+        write(f"class {main_model_name}(BaseModel):")
+        model_code.extend(field_lines)
         
         return '\n'.join(model_code)
     
+    def _split_enum_string(self, value: str) -> list:
+        """Split a comma-separated enum string, keeping known multi-part values together"""
+        parts = []
+        
+        # Split by comma but handle special cases
+        tokens = value.split(',')
+        i = 0
+        while i < len(tokens):
+            token = tokens[i].strip()
+            
+            # Check for multi-word values that should stay together
+            if (token.lower() in ['transport'] and i + 2 < len(tokens) and 
+                tokens[i+1].strip().lower() == 'mobility' and 
+                tokens[i+2].strip().lower() == 'logistics'):
+                # Combine "Transport, mobility, logistics" into one value
+                parts.append(f"{token}, {tokens[i+1].strip()}, {tokens[i+2].strip()}")
+                i += 3
+            elif (token.lower().startswith('business development') and i + 1 < len(tokens)):
+                # Combine "Business development/business services"
+                parts.append(f"{token}, {tokens[i+1].strip()}")
+                i += 2
+            else:
+                parts.append(token)
+                i += 1
+        
+        return parts
+    
     def _create_fallback_prompt(self, field_config: Dict[str, Any], model_code: str) -> str:
         """Create a fallback extraction prompt that embeds the model code when Claude generation fails"""
         
@@ -592,80 +644,12 @@ Make sure all enum values are properly formatted and all field types are correct
         description = field_config.get('description', 'Extract structured information from documents')
         main_model_name = field_config.get('main_model_name', 'GeneratedModel')
         
-        prompt_template = f"""TASK: {use_case}
-
-EXTRACTION TASK:
-{description}
-
-EMBEDDED PYDANTIC MODELS:
-```python
-{model_code}
-```
-
-CRITICAL EXTRACTION RULES:
-1. ACCURACY & VERIFICATION:
-   - Extract information ONLY from the provided text
-   - Never fabricate, infer, or guess any information
-   - Use 'n/a' for any fields where information is not explicitly stated
-   - Verify all extracted data against the source text
-   - Maintain exact values, dates, and numerical figures as written
-
-2. DATA HANDLING:
-   - For dates: Use DD-MM-YYYY format when possible
-   - For numbers: Preserve original precision and units
-   - For text: Maintain original spelling and capitalization
-   - For lists: Extract all relevant items, remove duplicates
-   - For enums: Choose ONLY from the specified options
-   - For the extracted fields whose length exceeds 30 words, summarize their text into less than 30 words comprising very brief key phrases separated by semi-colon.
-
-3. FIELD VALIDATION:
-   - Enum fields must match one of the specified values exactly
-   - List fields should contain valid, non-empty items
-   - Numerical fields should be valid numbers in correct format
-
-4. QUALITY ASSURANCE:
-   - Double-check all extracted information against source
-   - Ensure no information is duplicated across fields
-   - Verify that field types match the expected data types
-   - Confirm that all required fields are addressed
-   - Validate that enum selections are from available options
-
-
-OUTPUT FORMAT:
-Return the extracted information as a JSON object that exactly matches the {main_model_name} structure shown above.
-
-CRITICAL: All JSON field names MUST be in snake_case format (lowercase with underscores) to match the model exactly.
-For example: "due_date", "bank_name", "car_type" - NOT "Due date", "bank name", "car type"
-
-Example output structure:
-```json
-{{
-  "field_name_1": "extracted_value_or_n/a",
-  "field_name_2": ["list", "of", "values"],
-  "field_name_3": "enum_option_or_n/a"
-}}
-```
-
-VALIDATION CHECKLIST:
-Before returning your response, verify:
-- All required fields are populated or marked 'n/a'
-- All enum fields contain valid options only
-- All numerical fields contain valid numbers
-- All date fields follow proper format
-- No information is fabricated or inferred
-- JSON structure matches the model exactly
-- Field names match the model exactly
-- Data types are appropriate for each field
-
-FINAL INSTRUCTIONS:
-- Process the document systematically
-- Extract information field by field as specified above
-- Maintain accuracy over completeness
-- When in doubt, use 'n/a' rather than guessing
-- Return only the JSON object with extracted data
-- Ensure the output can be parsed as valid JSON"""
-
-        return prompt_template
+        return _STATIC_EXTRACTION_PROMPT_TEMPLATE.format(
+            use_case=use_case,
+            description=description,
+            model_code=model_code,
+            main_model_name=main_model_name,
+        )
     
     def get_extraction_prompt(self) -> str:
         """Get the generated extraction prompt"""
@@ -717,57 +701,107 @@ FINAL INSTRUCTIONS:
             logger.error(f"Error saving extraction prompt to file: {e}")
             raise
     
-    def load_models_and_prompt(self, model_file_path: str, prompt_file_path: str) -> tuple[Type, str]:
-        """Load models and extraction prompt from separate files"""
+    def load_models_and_prompt(self, model_file_path: str, prompt_file_path: str, require_prompt: bool = False) -> tuple[Type, str]:
+        """Load models and extraction prompt from separate files; a missing model file (or prompt file, if required) raises FileNotFoundError"""
         try:
-            # Load extraction prompt from Python file
-            extraction_prompt = ""
-            if os.path.exists(prompt_file_path):
-                with open(prompt_file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    # Extract the prompt from the Python file
-                    import re
-                    match = re.search(r'EXTRACTION_PROMPT = """(.*?)"""', content, re.DOTALL)
-                    if match:
-                        extraction_prompt = match.group(1).strip()
-                    else:
-                        # Fallback for text files (old format)
-                        lines = content.split('\n')
-                        prompt_lines = []
-                        skip_header = True
-                        for line in lines:
-                            if skip_header and not line.startswith('#') and line.strip():
-                                skip_header = False
-                            if not skip_header:
-                                prompt_lines.append(line)
-                        extraction_prompt = '\n'.join(prompt_lines).strip()
+            # Load extraction prompt from Python file; the loader's own stat doubles as the existence check
+            try:
+                extraction_prompt = self._load_saved_prompt(prompt_file_path)
+            except FileNotFoundError:
+                if require_prompt:
+                    raise
+                extraction_prompt = ""
             
             # Import the module to get the model class
-            import importlib.util
-            import sys
-            
-            spec = importlib.util.spec_from_file_location("loaded_models", model_file_path)
-            loaded_module = importlib.util.module_from_spec(spec)
-            sys.modules["loaded_models"] = loaded_module
-            spec.loader.exec_module(loaded_module)
+            from pydantic import BaseModel
             
-            # Find the main model class (usually the last class defined)
-            model_classes = [getattr(loaded_module, name) for name in dir(loaded_module) 
-                           if isinstance(getattr(loaded_module, name), type) and 
-                           issubclass(getattr(loaded_module, name), BaseModel) and
-                           getattr(loaded_module, name) != BaseModel]
+            loaded_module = self._load_model_module(model_file_path)
             
-            if model_classes:
+            # A reused module keeps its main model, already registered, from the first load
+            main_model = getattr(loaded_module, '__main_model__', None)
+            if main_model is None:
+                # Find the main model class (usually the last class defined)
+                module_values = [getattr(loaded_module, name) for name in dir(loaded_module)]
+                model_classes = [value for value in module_values 
+                               if isinstance(value, type) and issubclass(value, BaseModel) and value != BaseModel]
+                
+                if not model_classes:
+                    raise Exception("No valid Pydantic model found in file")
+                
                 main_model = model_classes[-1]  # Assume the last one is the main model
-                self.extraction_prompt = extraction_prompt
-                return main_model, extraction_prompt
-            else:
-                raise Exception("No valid Pydantic model found in file")
+                self._register_model_class(main_model)
+                loaded_module.__main_model__ = main_model
+            
+            self.extraction_prompt = extraction_prompt
+            return main_model, extraction_prompt
                 
         except Exception as e:
             logger.error(f"Error loading models from files: {e}")
             raise
     
+    def _load_saved_prompt(self, prompt_file_path: str) -> str:
+        """Read the extraction prompt from a saved prompt file, reusing it while the file is unchanged"""
+        file_stat = os.stat(prompt_file_path)
+        source_stat = (file_stat.st_mtime_ns, file_stat.st_size)
+        
+        cache_path = os.path.abspath(prompt_file_path)
+        cached = _LOADED_PROMPTS.get(cache_path)
+        if cached is not None and cached[0] == source_stat:
+            return cached[1]
+        
+        with open(prompt_file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        # Extract the prompt from the Python file
+        match = _RE_PROMPT_BLOCK.search(content)
+        if match:
+            extraction_prompt = match.group(1).strip()
+        else:
+            # Fallback for text files (old format)
+            lines = content.split('\n')
+            prompt_lines = []
+            skip_header = True
+            for line in lines:
+                if skip_header and not line.startswith('#') and line.strip():
+                    skip_header = False
+                if not skip_header:
+                    prompt_lines.append(line)
+            extraction_prompt = '\n'.join(prompt_lines).strip()
+        
+        _LOADED_PROMPTS[cache_path] = (source_stat, extraction_prompt)
+        return extraction_prompt
+    
+    def _load_model_module(self, model_file_path: str) -> types.ModuleType:
+        """Execute a saved model file, reusing the module while the file is unchanged"""
+        file_stat = os.stat(model_file_path)
+        source_stat = (file_stat.st_mtime_ns, file_stat.st_size)
+        
+        # Unchanged files skip the read, compile and pydantic schema building entirely
+        cached_name = _LOADED_MODEL_MODULES.get(os.path.abspath(model_file_path))
+        loaded_module = sys.modules.get(cached_name) if cached_name else None
+        if loaded_module is not None and getattr(loaded_module, '__source_stat__', None) == source_stat:
+            return loaded_module
+        
+        # Read the file once and compile the string; files with identical content share a module
+        with open(model_file_path, 'r', encoding='utf-8') as f:
+            model_source = f.read()
+        module_name = f"loaded_models_{hashlib.blake2b(model_source.encode('utf-8'), digest_size=16).hexdigest()}"
+        loaded_module = sys.modules.get(module_name)
+        if loaded_module is None:
+            code_obj = compile(model_source, model_file_path, 'exec')
+            loaded_module = types.ModuleType(module_name)
+            loaded_module.__file__ = model_file_path
+            sys.modules[module_name] = loaded_module
+            try:
+                exec(code_obj, loaded_module.__dict__)
+            except BaseException:
+                del sys.modules[module_name]
+                raise
+        
+        loaded_module.__source_stat__ = source_stat
+        _LOADED_MODEL_MODULES[os.path.abspath(model_file_path)] = module_name
+        return loaded_module
+    
     def load_prompt_from_file(self, prompt_file_path: str) -> str:
         """Load extraction prompt from text file"""
         try:
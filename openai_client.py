@@ -1,14 +1,29 @@
 import os
+import json
 import logging
-from typing import Dict, Any, Optional
-from openai import OpenAI, AzureOpenAI
+import httpx
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
+from openai import OpenAI, AzureOpenAI, AsyncOpenAI, AsyncAzureOpenAI
 from dotenv import load_dotenv
 
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; token counts fall back to a character estimate
+    tiktoken = None
+
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=8)
+def _shared_client(use_azure: bool, client_kwargs: Tuple[Tuple[str, Any], ...]):
+    """Create the sync SDK client once per connection settings, so every extractor reuses its connection pool"""
+    if use_azure:
+        return AzureOpenAI(**dict(client_kwargs))
+    return OpenAI(**dict(client_kwargs))
+
 class OpenAIClient:
     """OpenAI API client with support for both standard and Azure endpoints"""
     
@@ -17,12 +32,16 @@ class OpenAIClient:
         self.api_config = api_config or self._get_default_config()
         self.client = None
         self.model = None
+        self._client_kwargs = {}  # Connection settings shared by the sync and async clients
         
         # Initialize the appropriate client
         if self.api_config.get('use_azure', False):
             self._initialize_azure_client()
         else:
             self._initialize_standard_client()
+        
+        # Loaded once; encoder construction is far more expensive than encoding
+        self.encoder = self._load_encoder()
     
     def _get_default_config(self) -> Dict[str, Any]:
         """Get default OpenAI configuration"""
@@ -39,11 +58,12 @@ class OpenAIClient:
             if not api_key:
                 raise ValueError("AZURE_API_KEY not found in configuration or environment variables")
             
-            self.client = AzureOpenAI(
-                api_key=api_key,
-                api_version=self.api_config.get('api_version', 'gpt-4.1'),
-                azure_endpoint=self.api_config.get('azure_endpoint')
-            )
+            self._client_kwargs = {
+                'api_key': api_key,
+                'api_version': self.api_config.get('api_version', 'gpt-4.1'),
+                'azure_endpoint': self.api_config.get('azure_endpoint')
+            }
+            self.client = _shared_client(True, tuple(sorted(self._client_kwargs.items())))
             self.model = self.api_config.get('model', 'gpt-4.1')
             logger.info("Initialized Azure OpenAI client")
             
@@ -58,7 +78,8 @@ class OpenAIClient:
             if not api_key:
                 raise ValueError("OPENAI_API_KEY not found in configuration or environment variables")
             
-            self.client = OpenAI(api_key=api_key)
+            self._client_kwargs = {'api_key': api_key}
+            self.client = _shared_client(False, tuple(sorted(self._client_kwargs.items())))
             self.model = self.api_config.get('model', 'gpt-4.1-2025-04-14')
             logger.info("Initialized standard OpenAI client")
             
@@ -66,6 +87,43 @@ class OpenAIClient:
             logger.error(f"Failed to initialize standard OpenAI client: {e}")
             raise
     
+    def _load_encoder(self):
+        """Load the tiktoken encoding for the configured model, if tiktoken is installed"""
+        if tiktoken is None:
+            return None
+        try:
+            return tiktoken.encoding_for_model(self.model)
+        except KeyError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not load tiktoken encoding, estimating token counts instead: {e}")
+            return None
+        
+        # Unknown names (e.g. Azure deployments) use the encoding of the GPT-4o/GPT-4.1 family
+        try:
+            return tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            logger.warning(f"Could not load tiktoken encoding, estimating token counts instead: {e}")
+            return None
+    
+    def count_tokens(self, text: str) -> int:
+        """Count the tokens in text, estimating four characters per token without tiktoken"""
+        if self.encoder is None:
+            return len(text) // 4
+        return len(self.encoder.encode(text, disallowed_special=()))
+    
+    def create_async_client(self, max_retries: int = 2):
+        """Create an async OpenAI client for concurrent requests (use it within a single event loop)"""
+        # HTTP/2 multiplexes concurrent batch requests over a few pooled connections
+        http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(120.0, connect=10.0),
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        )
+        if self.api_config.get('use_azure', False):
+            return AsyncAzureOpenAI(max_retries=max_retries, http_client=http_client, **self._client_kwargs)
+        return AsyncOpenAI(max_retries=max_retries, http_client=http_client, **self._client_kwargs)
+    
     def generate_pydantic_models(self, field_config: Dict[str, Any]) -> str:
         """Generate Pydantic models using OpenAI"""
         use_case = field_config.get('use_case', 'Document Analysis')
@@ -159,7 +217,6 @@ Make sure all enum values are properly formatted and all field types are correct
     
     def _format_config(self, field_config: Dict[str, Any]) -> str:
         """Format field configuration for the prompt"""
-        import json
         return json.dumps(field_config, indent=2)
     
     def get_client_info(self) -> Dict[str, Any]:
@@ -1,8 +1,18 @@
 import os
-import json
+import re
+import copy
 import time
-from typing import Dict, Any, Type, List
+import hashlib
+import asyncio
+from functools import lru_cache
+from typing import Dict, Any, Type, List, Optional, Tuple
+import openai
+from pydantic import BaseModel, TypeAdapter
 from openai_client import OpenAIClient
+from rate_limiter import TokenBucket, backoff_delay, parse_retry_after
+import json_utils
+from fallback_data import create_fallback_data
+from response_cache import ResponseCache
 from dotenv import load_dotenv
 import logging
 
@@ -11,10 +21,70 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_SYSTEM_MESSAGE = "You are an expert data extraction specialist. Extract structured information from documents according to the provided schema and return valid JSON."
+
+# Used when tiktoken is unavailable; English text averages about four characters per token
+_CHARS_PER_TOKEN = 4
+# Generous upper bound on characters per token, used to size the text windows that are tokenized
+_MAX_CHARS_PER_TOKEN = 10
+_TRUNCATION_MARKER = "\n\n[... truncated ...]\n\n"
+
+# Placed between the static prompt and the documents when several documents share one request
+_MULTI_DOCUMENT_INSTRUCTIONS = """
+================================================
+
+The {count} documents below are independent. Extract the information from each document separately.
+Return a JSON object of the form {{"results": [...]}} holding exactly one extracted object per document, in the order the documents appear.
+"""
+
+# Recover the purpose and document type from the structured instruction built by the UI
+_PURPOSE_RE = re.compile(r"The purpose of this extraction task is (.+?)\. Therefore, the document should be related to")
+_DOC_TYPE_RE = re.compile(r"Therefore, the document should be related to (.+?)\. Do not attempt")
+
+@lru_cache(maxsize=32)
+def _list_adapter(model_class: Type) -> TypeAdapter:
+    """Build the adapter that dumps a list of model instances in one pydantic-core call, once per class"""
+    return TypeAdapter(List[model_class])
+
+@lru_cache(maxsize=32)
+def _parse_instructions(additional_instructions: str) -> Tuple[str, str, str]:
+    """Split additional instructions into purpose, document type and custom instructions, once per distinct text"""
+    if not additional_instructions.strip():
+        return "", "", ""
+    
+    # Split by double newlines to get separate instruction blocks
+    instruction_blocks = additional_instructions.split('\n\n')
+    
+    extraction_purpose = ""
+    document_type = ""
+    custom_instructions = ""
+    
+    for block in instruction_blocks:
+        # Check if this block contains the structured purpose/document type instruction
+        if "The purpose of this extraction task is" in block and "Therefore, the document should be related to" in block:
+            # Extract purpose and document type from the structured instruction
+            purpose_match = _PURPOSE_RE.search(block)
+            doc_type_match = _DOC_TYPE_RE.search(block)
+            
+            if purpose_match:
+                extraction_purpose = purpose_match.group(1).strip()
+            if doc_type_match:
+                document_type = doc_type_match.group(1).strip()
+        else:
+            # This is a custom instruction block
+            if custom_instructions:
+                custom_instructions += "\n\n" + block.strip()
+            else:
+                custom_instructions = block.strip()
+    
+    return extraction_purpose, document_type, custom_instructions
+
 class OpenAIExtractor:
     """OpenAI GPT-4.1 powered data extraction"""
     
-    def __init__(self, api_config=None):
+    def __init__(self, api_config=None, max_concurrency: int = 20, max_context_tokens: int = 128000, 
+                 documents_per_request: int = 1, use_cache: bool = True, 
+                 cache_dir: str = '.cache/openai_responses', max_output_tokens: int = 32768):
         # Use centralized OpenAI client
         self.openai_client = OpenAIClient(api_config=api_config)
         self.client = self.openai_client.client
@@ -23,12 +93,209 @@ class OpenAIExtractor:
         
         self.max_tokens = 4000
         self.temperature = 0.0  # Zero temperature for maximum consistency
+        self.max_concurrency = max_concurrency  # Concurrent OpenAI requests during batch extraction
+        self.max_attempts = 5  # Attempts per request for connection errors, timeouts, rate limits and 5xx responses
+        # Optional client-side limits matching the account's quota (None leaves them unlimited)
+        self.max_requests_per_minute = self.api_config.get('max_requests_per_minute')
+        self.max_tokens_per_minute = self.api_config.get('max_tokens_per_minute')
+        # Context window shared by the prompt and max_tokens; longer documents keep only their head and tail (None disables)
+        self.max_context_tokens = max_context_tokens
+        # Documents grouped into one batch request so they share the static prompt (1 sends each on its own)
+        self.documents_per_request = max(1, documents_per_request)
+        # Most output tokens a single grouped request may ask for, within the model's completion limit
+        self.max_output_tokens = max_output_tokens
+        # Async requests stream their replies, handing control back to the event loop on every chunk
+        self.stream_responses = True
+        # Responses are reproducible at zero temperature, so identical requests can be served from disk
+        self.response_cache = ResponseCache(cache_dir) if use_cache else None
     
     def extract_data(self, document_content: str, extraction_prompt: str, 
                     model_class: Type, document_metadata: Dict[str, Any], 
                     additional_instructions: str = "") -> Dict[str, Any]:
         """Extract structured data from document using OpenAI GPT-4.1"""
         
+        static_prompt = self._build_static_prompt(extraction_prompt, additional_instructions)
+        
+        try:
+            document_prompt, _ = self._build_document_prompt(document_content, document_metadata, self._count_static_tokens(static_prompt))
+            cache_key = self._cache_key(static_prompt, document_prompt, model_class)
+            
+            cached_text = self._get_cached_response(cache_key, document_metadata)
+            if cached_text is not None:
+                return self._dump_extraction(self._process_extraction(cached_text, model_class, document_metadata))
+            
+            logger.info(f"Extracting data from document: {document_metadata.get('file_name', 'Unknown')}")
+            start_time = time.time()
+            
+            response = self._create_with_retries(self._request_params(static_prompt, document_prompt))
+            
+            elapsed_time = time.time() - start_time
+            logger.info(f"OpenAI extraction completed in {elapsed_time:.2f} seconds")
+            
+            return self._dump_extraction(
+                self._process_extraction(response.choices[0].message.content, model_class, document_metadata, cache_key)
+            )
+                
+        except Exception as e:
+            logger.error(f"Error extracting data from {document_metadata.get('file_name')}: {e}")
+            # Return fallback data structure
+            return self._create_fallback_data(model_class, document_metadata)
+    
+    async def extract_data_async(self, document_content: str, extraction_prompt: str, 
+                                 model_class: Type, document_metadata: Dict[str, Any], 
+                                 additional_instructions: str = "", 
+                                 async_client=None) -> Dict[str, Any]:
+        """Extract structured data from document using OpenAI without blocking the event loop"""
+        
+        if async_client is None:
+            async with self.openai_client.create_async_client(max_retries=0) as async_client:
+                return await self.extract_data_async(document_content, extraction_prompt, model_class, 
+                                                     document_metadata, additional_instructions, async_client)
+        
+        static_prompt = self._build_static_prompt(extraction_prompt, additional_instructions)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._dump_extraction(await self._extract_async(
+            async_client, semaphore, self._create_rate_buckets(), static_prompt, 
+            self._count_static_tokens(static_prompt), document_content, model_class, document_metadata
+        ))
+    
+    async def _extract_async(self, async_client, semaphore: asyncio.Semaphore, 
+                             rate_buckets: Tuple[Optional[TokenBucket], Optional[TokenBucket]], static_prompt: str, 
+                             static_tokens: int, document_content: str, model_class: Type, 
+                             document_metadata: Dict[str, Any]) -> Any:
+        """Send one document to OpenAI reusing a prebuilt static prompt, returning the model instance or raw JSON"""
+        
+        try:
+            # Tokenizing a long document is CPU work; a worker thread lets it overlap with requests in flight
+            document_prompt, prompt_tokens = await asyncio.to_thread(
+                self._build_document_prompt, document_content, document_metadata, static_tokens
+            )
+            cache_key = self._cache_key(static_prompt, document_prompt, model_class)
+            
+            cached_text = self._get_cached_response(cache_key, document_metadata)
+            if cached_text is not None:
+                return self._process_extraction(cached_text, model_class, document_metadata)
+            
+            # Tokens this request debits from the per-minute budget
+            estimated_tokens = prompt_tokens + self.max_tokens
+            
+            logger.info(f"Extracting data from document: {document_metadata.get('file_name', 'Unknown')}")
+            start_time = time.time()
+            
+            response_text = await self._send_with_limits(
+                async_client, semaphore, rate_buckets, self._request_params(static_prompt, document_prompt), estimated_tokens
+            )
+            
+            elapsed_time = time.time() - start_time
+            logger.info(f"OpenAI extraction completed in {elapsed_time:.2f} seconds")
+            
+            return self._process_extraction(response_text, model_class, document_metadata, cache_key)
+                
+        except Exception as e:
+            logger.error(f"Error extracting data from {document_metadata.get('file_name')}: {e}")
+            # Return fallback data structure
+            return self._create_fallback_data(model_class, document_metadata)
+    
+    async def _extract_group_async(self, async_client, semaphore: asyncio.Semaphore, 
+                                   rate_buckets: Tuple[Optional[TokenBucket], Optional[TokenBucket]], static_prompt: str, 
+                                   static_tokens: int, documents: List[Dict[str, Any]], 
+                                   model_class: Type) -> Optional[List[Any]]:
+        """Send several documents to OpenAI in one request, returning None if the response can't be split per document"""
+        
+        file_names = ', '.join(doc.get('file_name', 'Unknown') for doc in documents)
+        try:
+            group_prompt, prompt_tokens = await asyncio.to_thread(self._build_group_prompt, documents, static_tokens)
+            max_tokens = self._group_max_tokens(len(documents))
+            
+            logger.info(f"Extracting data from {len(documents)} documents in one request: {file_names}")
+            start_time = time.time()
+            
+            response_text = await self._send_with_limits(
+                async_client, semaphore, rate_buckets, self._request_params(static_prompt, group_prompt, max_tokens), 
+                prompt_tokens + max_tokens
+            )
+            
+            elapsed_time = time.time() - start_time
+            logger.info(f"OpenAI extraction completed in {elapsed_time:.2f} seconds")
+            
+            extracted = json_utils.loads(response_text).get('results')
+            if not isinstance(extracted, list) or len(extracted) != len(documents) or not all(isinstance(item, dict) for item in extracted):
+                raise ValueError(f"expected {len(documents)} results in the response")
+        
+        except Exception as e:
+            logger.warning(f"Multi-document extraction failed for {file_names} ({e}), extracting them one by one")
+            return None
+        
+        return [self._validate_extraction(item, model_class, doc) for item, doc in zip(extracted, documents)]
+    
+    def _create_rate_buckets(self) -> Tuple[Optional[TokenBucket], Optional[TokenBucket]]:
+        """Create the request and token buckets for one event loop, if limits are configured"""
+        request_bucket = TokenBucket(self.max_requests_per_minute) if self.max_requests_per_minute else None
+        token_bucket = TokenBucket(self.max_tokens_per_minute) if self.max_tokens_per_minute else None
+        return request_bucket, token_bucket
+    
+    def _create_with_retries(self, params: Dict[str, Any]):
+        """Call chat.completions.create, retrying transient failures with exponential backoff and jitter"""
+        # Retries are handled here, so the SDK's own retry loop is disabled to avoid multiplying attempts
+        client = self.client.with_options(max_retries=0)
+        
+        for attempt in range(self.max_attempts):
+            try:
+                return client.chat.completions.create(**params)
+            except Exception as e:
+                if not self._is_retryable(e) or attempt == self.max_attempts - 1:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                logger.warning(f"OpenAI request failed ({e}), retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_attempts})")
+                time.sleep(delay)
+    
+    async def _send_with_limits(self, async_client, semaphore: asyncio.Semaphore, 
+                                rate_buckets: Tuple[Optional[TokenBucket], Optional[TokenBucket]], 
+                                params: Dict[str, Any], estimated_tokens: int):
+        """Send a request within the concurrency and per-minute limits, retrying transient failures, and return the reply text"""
+        request_bucket, token_bucket = rate_buckets
+        
+        for attempt in range(self.max_attempts):
+            async with semaphore:
+                if request_bucket:
+                    await request_bucket.acquire(1)
+                if token_bucket:
+                    await token_bucket.acquire(estimated_tokens)
+                try:
+                    if not self.stream_responses:
+                        response = await async_client.chat.completions.create(**params)
+                        return response.choices[0].message.content
+                    # Each streamed delta hands control back to the event loop while the reply is generated
+                    stream = await async_client.chat.completions.create(**params, stream=True)
+                    parts = [chunk.choices[0].delta.content or "" async for chunk in stream if chunk.choices]
+                    return "".join(parts)
+                except Exception as e:
+                    if not self._is_retryable(e) or attempt == self.max_attempts - 1:
+                        raise
+                    retry_error = e
+            
+            # Sleep outside the semaphore so other documents can use the slot meanwhile
+            delay = self._retry_delay(retry_error, attempt)
+            logger.warning(f"OpenAI request failed ({retry_error}), retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_attempts})")
+            await asyncio.sleep(delay)
+    
+    def _is_retryable(self, error: Exception) -> bool:
+        """Check whether an OpenAI API error is transient"""
+        # APITimeoutError is a subclass of APIConnectionError
+        if isinstance(error, (openai.APIConnectionError, openai.RateLimitError)):
+            return True
+        return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Get the wait before retrying, honouring Retry-After on rate limit errors"""
+        delay = backoff_delay(attempt)
+        if isinstance(error, openai.RateLimitError):
+            return parse_retry_after(error.response.headers, default=delay)
+        return delay
+    
+    def _build_static_prompt(self, extraction_prompt: str, additional_instructions: str) -> str:
+        """Build the part of the prompt that is identical for every document in a batch"""
+        
         # Parse additional instructions to extract context components
         extraction_purpose, document_type, custom_instructions = self._parse_additional_instructions(additional_instructions)
         
@@ -47,7 +314,7 @@ class OpenAIExtractor:
         if custom_instructions.strip():
             context_sections.append(f"\nCUSTOM/ADDITIONAL EXTRACTION INSTRUCTIONS:\n{custom_instructions}\n")
         
-        full_prompt = f"""
+        return f"""
 
 Extract the required information considering the context of EXTRACTION TASK, purpose of extraction, document type, and the EXTRACTION RULES. 
 Return the extracted information as a valid JSON object that matches the specified schema.
@@ -57,130 +324,402 @@ Ensure all required fields are included and follow the exact field names and typ
 {extraction_prompt}
 
 IMPORTANT: Return ONLY the JSON object, no additional text, explanations, or markdown formatting.
-
+"""
+    
+    def _count_static_tokens(self, static_prompt: str) -> int:
+        """Count the prompt tokens shared by every document: the system message and the static prompt"""
+        return self.openai_client.count_tokens(_SYSTEM_MESSAGE) + self.openai_client.count_tokens(static_prompt)
+    
+    def _build_document_prompt(self, document_content: str, document_metadata: Dict[str, Any], 
+                               static_tokens: int = 0) -> Tuple[str, int]:
+        """Build the per-document part of the prompt, returning it with the request's total prompt tokens"""
+        header = f"""
 ================================================
 
 Document to analyze:
 Filename: {document_metadata.get('file_name', 'Unknown')}
 Content:
-{document_content}
-"""       
+"""
+        fixed_tokens = static_tokens + self.openai_client.count_tokens(header)
+        budget_tokens = self.max_context_tokens - self.max_tokens - fixed_tokens if self.max_context_tokens else None
+        document_content, content_tokens = self._truncate_content(document_content, document_metadata, budget_tokens)
+        return f"{header}{document_content}\n", fixed_tokens + content_tokens
+    
+    def _group_max_tokens(self, document_count: int) -> int:
+        """Output tokens for a grouped request: each document's share, capped at max_output_tokens"""
+        return min(self.max_tokens * document_count, self.max_output_tokens)
+    
+    def _build_group_prompt(self, documents: List[Dict[str, Any]], static_tokens: int = 0) -> Tuple[str, int]:
+        """Build the prompt part listing several documents, returning it with the request's total prompt tokens"""
+        instructions = _MULTI_DOCUMENT_INSTRUCTIONS.format(count=len(documents))
+        headers = [f"\n=== DOC {i} ({doc.get('file_name', 'Unknown')}) ===\nContent:\n" for i, doc in enumerate(documents, 1)]
+        
+        fixed_tokens = (static_tokens + self.openai_client.count_tokens(instructions) 
+                        + sum(self.openai_client.count_tokens(header) for header in headers))
+        # The context left after the output tokens is split evenly between the documents
+        budget_tokens = ((self.max_context_tokens - self._group_max_tokens(len(documents)) - fixed_tokens) // len(documents) 
+                         if self.max_context_tokens else None)
+        
+        parts = [instructions]
+        total_tokens = fixed_tokens
+        for header, doc in zip(headers, documents):
+            document_content, content_tokens = self._truncate_content(doc['text_content'], doc, budget_tokens)
+            parts.append(f"{header}{document_content}\n")
+            total_tokens += content_tokens
+        return ''.join(parts), total_tokens
+    
+    def _truncate_content(self, document_content: str, document_metadata: Dict[str, Any], 
+                          budget_tokens: Optional[int]) -> Tuple[str, int]:
+        """Keep the head and tail of documents over the token budget, returning the content and its token count"""
+        encoder = self.openai_client.encoder
+        marker_tokens = self.openai_client.count_tokens(_TRUNCATION_MARKER)
+        
+        # Documents this long are over budget whatever their tokenization, so only the head and tail
+        # windows that can survive truncation are sliced out and tokenized, never the whole text
+        if encoder is not None and budget_tokens is not None and len(document_content) > max(0, budget_tokens) * _MAX_CHARS_PER_TOKEN:
+            keep_tokens = max(0, budget_tokens - marker_tokens) // 2
+            logger.warning(f"Truncating {document_metadata.get('file_name', 'Unknown')} from ~{len(document_content) // _CHARS_PER_TOKEN} "
+                           f"to ~{max(0, budget_tokens)} tokens (keeping the beginning and end)")
+            if keep_tokens == 0:
+                return _TRUNCATION_MARKER.strip(), marker_tokens
+            
+            window_chars = keep_tokens * _MAX_CHARS_PER_TOKEN
+            head_tokens = encoder.encode(document_content[:window_chars], disallowed_special=())[:keep_tokens]
+            tail_tokens = encoder.encode(document_content[-window_chars:], disallowed_special=())[-keep_tokens:]
+            return (encoder.decode(head_tokens) + _TRUNCATION_MARKER + encoder.decode(tail_tokens), 
+                    len(head_tokens) + len(tail_tokens) + marker_tokens)
+        
+        if encoder is not None:
+            tokens = encoder.encode(document_content, disallowed_special=())
+            content_tokens = len(tokens)
+        else:
+            content_tokens = len(document_content) // _CHARS_PER_TOKEN
+        
+        if budget_tokens is None or content_tokens <= budget_tokens:
+            return document_content, content_tokens
+        
+        budget_tokens = max(0, budget_tokens)
+        logger.warning(f"Truncating {document_metadata.get('file_name', 'Unknown')} from {content_tokens} "
+                       f"to ~{budget_tokens} tokens (keeping the beginning and end)")
+        
+        keep_tokens = max(0, budget_tokens - marker_tokens) // 2
+        if keep_tokens == 0:
+            return _TRUNCATION_MARKER.strip(), marker_tokens
+        
+        if encoder is not None:
+            # Slicing tokens rather than characters keeps the result exactly within budget
+            head, tail = encoder.decode(tokens[:keep_tokens]), encoder.decode(tokens[-keep_tokens:])
+        else:
+            keep_chars = keep_tokens * _CHARS_PER_TOKEN
+            head, tail = document_content[:keep_chars], document_content[-keep_chars:]
+        return head + _TRUNCATION_MARKER + tail, 2 * keep_tokens + marker_tokens
+    
+    def _request_params(self, static_prompt: str, document_prompt: str, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Build the chat.completions.create parameters, keeping the static prompt as the shared prefix"""
+        return {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "system", 
+                    "content": _SYSTEM_MESSAGE
+                },
+                {
+                    "role": "user", 
+                    # Static text first so OpenAI's automatic prompt caching can reuse it across documents
+                    "content": static_prompt + document_prompt
+                }
+            ],
+            "max_tokens": max_tokens or self.max_tokens,
+            "temperature": self.temperature,
+            "response_format": {"type": "json_object"}  # Ensure JSON response
+        }
+    
+    def _process_extraction(self, response_text: str, model_class: Type, document_metadata: Dict[str, Any], 
+                            cache_key: str = None) -> Any:
+        """Parse, cache and validate the JSON returned by OpenAI"""
+        # Parse the JSON response (orjson when installed)
+        extracted_json = json_utils.loads(response_text)
+        # Only replies that parsed are cached, so a malformed one is requested again next run
+        self._cache_response(cache_key, response_text)
+        return self._validate_extraction(extracted_json, model_class, document_metadata)
+    
+    def _cache_key(self, static_prompt: str, document_prompt: str, model_class: Type) -> str:
+        """Build the response cache key for a request"""
+        return ResponseCache.make_key(self.model, self.temperature, static_prompt, document_prompt, model_class.__name__)
+    
+    def _get_cached_response(self, cache_key: str, document_metadata: Dict[str, Any]) -> Optional[str]:
+        """Return the cached reply text for the request, if caching is enabled and it exists"""
+        if self.response_cache is None:
+            return None
+        cached_text = self.response_cache.get(cache_key)
+        if cached_text is not None:
+            logger.info(f"Using cached OpenAI response for {document_metadata.get('file_name', 'Unknown')}")
+        return cached_text
+    
+    def _cache_response(self, cache_key: str, response_text: str) -> None:
+        """Store a reply so identical requests are served from disk on the next run"""
+        if cache_key and self.response_cache is not None:
+            self.response_cache.set(cache_key, response_text)
+    
+    def _validate_extraction(self, extracted_json: Dict[str, Any], model_class: Type, 
+                             document_metadata: Dict[str, Any]) -> Any:
+        """Validate one extracted JSON object into a model instance, falling back to the raw JSON"""
+        # Validate and create model instance; json_object mode only guarantees JSON, not the schema, so the reply
+        # is always validated (coercing types, checking constraints and building enums and nested models)
         try:
-            logger.info(f"Extracting data from document: {document_metadata.get('file_name', 'Unknown')}")
-            start_time = time.time()
+            model_instance = model_class.model_validate(extracted_json)
+            logger.info(f"Successfully created model instance for {document_metadata.get('file_name')}")
+            return model_instance
+        
+        except Exception as validation_error:
+            logger.warning(f"Validation error for {document_metadata.get('file_name')}: {validation_error}")
+            # Return raw JSON if validation fails
+            return extracted_json
+    
+    def _dump_extraction(self, extraction: Any) -> Dict[str, Any]:
+        """Convert a model instance into a plain dict, passing raw JSON and fallback data through"""
+        if isinstance(extraction, BaseModel):
+            return extraction.model_dump()
+        return extraction
+    
+    def _dump_extractions(self, extractions: List[Any], model_class: Type) -> List[Any]:
+        """Dump every model instance in a batch with one pydantic-core call, leaving other outcomes as they are"""
+        positions = [i for i, extraction in enumerate(extractions) if isinstance(extraction, model_class)]
+        if not positions:
+            return extractions
+        
+        try:
+            dumped = _list_adapter(model_class).dump_python([extractions[i] for i in positions])
+        except Exception as e:
+            logger.warning(f"Bulk dump of {len(positions)} results failed ({e}), dumping them one by one")
+            dumped = [self._dump_extraction(extractions[i]) for i in positions]
+        
+        extractions = list(extractions)
+        for i, data in zip(positions, dumped):
+            extractions[i] = data
+        return extractions
+    
+    def extract_batch(self, documents: List[Dict[str, Any]], extraction_prompt: str, 
+                     model_class: Type, additional_instructions: str = "", 
+                     mode: str = "realtime") -> List[Dict[str, Any]]:
+        """Extract data from multiple documents using OpenAI ("realtime" requests or an offline "batch" job)"""
+        if mode == "batch":
+            return self.extract_batch_offline(documents, extraction_prompt, model_class, additional_instructions)
+        if mode != "realtime":
+            raise ValueError(f"Unsupported extraction mode: {mode}")
+        return asyncio.run(self.extract_batch_async(documents, extraction_prompt, model_class, additional_instructions))
+    
+    def extract_batch_offline(self, documents: List[Dict[str, Any]], extraction_prompt: str, 
+                              model_class: Type, additional_instructions: str = "", 
+                              poll_interval: float = 30.0) -> List[Dict[str, Any]]:
+        """Extract data from multiple documents as one Batch API job (half price, results can take up to 24h)"""
+        
+        total_docs = len(documents)
+        # Identical documents are extracted once and the result copied to each of them
+        groups = self._group_duplicate_documents(documents)
+        unique_documents = [documents[indices[0]] for indices in groups.values()]
+        unique_docs = len(unique_documents)
+        logger.info(f"Starting offline batch extraction for {total_docs} documents ({unique_docs} unique) using OpenAI")
+        
+        static_prompt = self._build_static_prompt(extraction_prompt, additional_instructions)
+        static_tokens = self._count_static_tokens(static_prompt)
+        # Azure deployments expose chat completions without the /v1 prefix
+        endpoint = "/chat/completions" if self.api_config.get('use_azure', False) else "/v1/chat/completions"
+        
+        outcomes = [None] * unique_docs
+        cache_keys = [None] * unique_docs
+        lines = []
+        for i, doc in enumerate(unique_documents):
+            document_prompt, _ = self._build_document_prompt(doc['text_content'], doc, static_tokens)
+            cache_keys[i] = self._cache_key(static_prompt, document_prompt, model_class)
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are an expert data extraction specialist. Extract structured information from documents according to the provided schema and return valid JSON."
-                    },
-                    {
-                        "role": "user", 
-                        "content": full_prompt
-                    }
-                ],
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                response_format={"type": "json_object"}  # Ensure JSON response
-            )
+            cached_text = self._get_cached_response(cache_keys[i], doc)
+            if cached_text is not None:
+                try:
+                    outcomes[i] = self._process_extraction(cached_text, model_class, doc)
+                    continue
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable cache entry for {doc.get('file_name', 'Unknown')}: {e}")
             
-            elapsed_time = time.time() - start_time
-            logger.info(f"OpenAI extraction completed in {elapsed_time:.2f} seconds")
+            # Results are routed back by position, as file names need not be unique
+            lines.append(json_utils.dumps_bytes({
+                "custom_id": f"doc-{i}",
+                "method": "POST",
+                "url": endpoint,
+                "body": self._request_params(static_prompt, document_prompt)
+            }))
+        
+        try:
+            if not lines:
+                logger.info("All documents were served from the response cache, no batch submitted")
+                return self._fan_out_results(documents, groups, outcomes, model_class)
             
-            # Parse the JSON response
-            extracted_json = json.loads(response.choices[0].message.content)
+            input_file = self.client.files.create(file=("batch_requests.jsonl", b"\n".join(lines)), purpose="batch")
+            batch = self.client.batches.create(input_file_id=input_file.id, endpoint=endpoint, completion_window="24h")
+            logger.info(f"Submitted OpenAI batch {batch.id} with {len(lines)} requests")
             
-            # Validate and create model instance
-            try:
-                model_instance = model_class(**extracted_json)
-                logger.info(f"Successfully created model instance for {document_metadata.get('file_name')}")
-                return model_instance.model_dump()
-            
-            except Exception as validation_error:
-                logger.warning(f"Validation error for {document_metadata.get('file_name')}: {validation_error}")
-                # Return raw JSON if validation fails
-                return extracted_json
-                
+            while batch.status not in ("completed", "failed", "expired", "cancelled"):
+                time.sleep(poll_interval)
+                batch = self.client.batches.retrieve(batch.id)
+                counts = batch.request_counts
+                logger.info(f"OpenAI batch {batch.id} is {batch.status}"
+                            + (f" ({counts.completed} completed, {counts.failed} failed)" if counts else ""))
+            
+            # Expired batches still return the requests that finished in time
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if not file_id:
+                    continue
+                for line in self.client.files.content(file_id).text.splitlines():
+                    if not line.strip():
+                        continue
+                    entry = json_utils.loads(line)
+                    i = int(entry['custom_id'].split('-', 1)[1])
+                    response = entry.get('response') or {}
+                    
+                    if response.get('status_code') == 200:
+                        try:
+                            outcomes[i] = self._process_extraction(
+                                response['body']['choices'][0]['message']['content'], model_class, unique_documents[i], cache_keys[i]
+                            )
+                        except Exception as e:
+                            outcomes[i] = e
+                    else:
+                        error_detail = entry.get('error') or response.get('body', {}).get('error')
+                        outcomes[i] = RuntimeError(f"Batch request failed: {error_detail}")
+            
+            if batch.status != "completed":
+                logger.error(f"OpenAI batch {batch.id} ended as {batch.status}: {batch.errors}")
+            for i, outcome in enumerate(outcomes):
+                if outcome is None:
+                    outcomes[i] = RuntimeError(f"No result returned by batch (status: {batch.status})")
+        
         except Exception as e:
-            logger.error(f"Error extracting data from {document_metadata.get('file_name')}: {e}")
-            # Return fallback data structure
-            return self._create_fallback_data(model_class, document_metadata)
+            logger.error(f"OpenAI batch failed: {e}")
+            outcomes = [e if outcome is None else outcome for outcome in outcomes]
+        
+        results = self._fan_out_results(documents, groups, outcomes, model_class)
+        
+        logger.info(f"OpenAI offline batch extraction completed. Processed {len(results)} documents")
+        return results
     
-    def extract_batch(self, documents: List[Dict[str, Any]], extraction_prompt: str, 
-                     model_class: Type, additional_instructions: str = "") -> List[Dict[str, Any]]:
-        """Extract data from multiple documents"""
+    async def extract_batch_async(self, documents: List[Dict[str, Any]], extraction_prompt: str, 
+                                  model_class: Type, additional_instructions: str = "") -> List[Dict[str, Any]]:
+        """Extract data from multiple documents concurrently using OpenAI"""
         
-        results = []
         total_docs = len(documents)
+        # Identical documents are extracted once and the result copied to each of them
+        groups = self._group_duplicate_documents(documents)
+        unique_documents = [documents[indices[0]] for indices in groups.values()]
+        unique_docs = len(unique_documents)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        rate_buckets = self._create_rate_buckets()
+        
+        # Built once per batch so every request shares the same prompt prefix
+        static_prompt = self._build_static_prompt(extraction_prompt, additional_instructions)
+        static_tokens = self._count_static_tokens(static_prompt)
         
-        logger.info(f"Starting batch extraction for {total_docs} documents")
+        documents_per_request = self.documents_per_request
+        logger.info(f"Starting batch extraction for {total_docs} documents ({unique_docs} unique) (max concurrency: {self.max_concurrency}, "
+                    f"documents per request: {documents_per_request})")
         
-        for i, doc in enumerate(documents, 1):
-            logger.info(f"Processing document {i}/{total_docs}: {doc.get('file_name')}")
+        async with self.openai_client.create_async_client(max_retries=0) as async_client:
             
-            try:
-                extracted_data = self.extract_data(
+            async def extract_document(i: int, doc: Dict[str, Any]) -> Dict[str, Any]:
+                logger.info(f"Processing document {i}/{unique_docs}: {doc.get('file_name')}")
+                
+                return await self._extract_async(
+                    async_client=async_client,
+                    semaphore=semaphore,
+                    rate_buckets=rate_buckets,
+                    static_prompt=static_prompt,
+                    static_tokens=static_tokens,
                     document_content=doc['text_content'],
-                    extraction_prompt=extraction_prompt,
                     model_class=model_class,
-                    document_metadata=doc,
-                    additional_instructions=additional_instructions
+                    document_metadata=doc
                 )
+            
+            async def extract_group(indices: List[int]) -> List[Any]:
+                group = [unique_documents[i] for i in indices]
+                extracted = None
+                if len(group) > 1:
+                    logger.info(f"Processing documents {indices[0] + 1}-{indices[-1] + 1}/{unique_docs} in one request")
+                    extracted = await self._extract_group_async(async_client, semaphore, rate_buckets, static_prompt, 
+                                                                static_tokens, group, model_class)
+                if extracted is None:
+                    # Single documents, and groups whose response couldn't be split, are sent one by one
+                    extracted = await asyncio.gather(
+                        *(extract_document(i + 1, unique_documents[i]) for i in indices), return_exceptions=True
+                    )
+                return extracted
+            
+            if documents_per_request > 1:
+                request_groups = [list(range(start, min(start + documents_per_request, unique_docs))) 
+                                  for start in range(0, unique_docs, documents_per_request)]
+                # return_exceptions keeps one failing group from cancelling the rest of the batch
+                group_outcomes = await asyncio.gather(*(extract_group(indices) for indices in request_groups), return_exceptions=True)
+                outcomes = []
+                for indices, group_outcome in zip(request_groups, group_outcomes):
+                    outcomes.extend([group_outcome] * len(indices) if isinstance(group_outcome, BaseException) else group_outcome)
+            else:
+                # return_exceptions keeps one failing document from cancelling the rest of the batch
+                outcomes = await asyncio.gather(
+                    *(extract_document(i, doc) for i, doc in enumerate(unique_documents, 1)),
+                    return_exceptions=True
+                )
+        
+        results = self._fan_out_results(documents, groups, outcomes, model_class)
+        
+        logger.info(f"Batch extraction completed. Processed {len(results)} documents")
+        return results
+    
+    def _group_duplicate_documents(self, documents: List[Dict[str, Any]]) -> Dict[bytes, List[int]]:
+        """Group document indices by a hash of their text content, in order of first occurrence"""
+        groups = {}
+        for index, doc in enumerate(documents):
+            digest = hashlib.blake2b(doc['text_content'].encode('utf-8'), digest_size=16).digest()
+            groups.setdefault(digest, []).append(index)
+        return groups
+    
+    def _fan_out_results(self, documents: List[Dict[str, Any]], groups: Dict[bytes, List[int]], 
+                         group_results: List[Any], model_class: Type) -> List[Dict[str, Any]]:
+        """Copy each group's extraction result to all of its documents and attach their metadata"""
+        results = [None] * len(documents)
+        group_results = self._dump_extractions(group_results, model_class)
+        
+        for indices, outcome in zip(groups.values(), group_results):
+            for index in indices:
+                doc = documents[index]
                 
-                # Add document metadata to results
-                extracted_data['_document_metadata'] = {
-                    'file_name': doc['file_name'],
-                    'file_path': doc['file_path'],
-                    'content_length': doc['content_length'],
-                    'word_count': doc['word_count']
-                }
-                
-                results.append(extracted_data)
+                if isinstance(outcome, BaseException):
+                    logger.error(f"Failed to process document {doc.get('file_name')}: {outcome}")
+                    # Add fallback result
+                    extracted_data = self._create_fallback_data(model_class, doc)
+                    extracted_data['_document_metadata'] = self._document_metadata(doc, str(outcome))
+                else:
+                    extracted_data = outcome if index == indices[0] else copy.deepcopy(outcome)
+                    # Add document metadata to results
+                    extracted_data['_document_metadata'] = self._document_metadata(doc)
                 
-            except Exception as e:
-                logger.error(f"Failed to process document {doc.get('file_name')}: {e}")
-                # Add fallback result
-                fallback_data = self._create_fallback_data(model_class, doc)
-                fallback_data['_document_metadata'] = {
-                    'file_name': doc['file_name'],
-                    'file_path': doc['file_path'],
-                    'content_length': doc['content_length'],
-                    'word_count': doc['word_count'],
-                    'extraction_error': str(e)
-                }
-                results.append(fallback_data)
+                results[index] = extracted_data
         
-        logger.info(f"Batch extraction completed. Processed {len(results)} documents")
         return results
     
+    def _document_metadata(self, doc: Dict[str, Any], extraction_error: str = None) -> Dict[str, Any]:
+        """Build the document metadata attached to each batch result"""
+        metadata = {
+            'file_name': doc['file_name'],
+            'file_path': doc['file_path'],
+            'content_length': doc['content_length'],
+            'word_count': doc['word_count']
+        }
+        if extraction_error is not None:
+            metadata['extraction_error'] = extraction_error
+        return metadata
+    
     def _create_fallback_data(self, model_class: Type, document_metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Create fallback data when extraction fails"""
         try:
-            # Try to create a minimal instance with default values
-            model_fields = model_class.model_fields
-            fallback_data = {}
-            
-            for field_name, field_info in model_fields.items():
-                if hasattr(field_info, 'default') and field_info.default is not None:
-                    fallback_data[field_name] = field_info.default
-                else:
-                    # Provide basic fallback based on type
-                    if 'str' in str(field_info.annotation):
-                        fallback_data[field_name] = "n/a"
-                    elif 'int' in str(field_info.annotation):
-                        fallback_data[field_name] = 0
-                    elif 'float' in str(field_info.annotation):
-                        fallback_data[field_name] = 0.0
-                    elif 'bool' in str(field_info.annotation):
-                        fallback_data[field_name] = False
-                    elif 'List' in str(field_info.annotation):
-                        fallback_data[field_name] = []
-                    else:
-                        fallback_data[field_name] = "n/a"
-            
-            return fallback_data
+            return create_fallback_data(model_class)
             
         except Exception as e:
             logger.error(f"Error creating fallback data: {e}")
@@ -188,36 +727,7 @@ Content:
     
     def _parse_additional_instructions(self, additional_instructions: str) -> tuple[str, str, str]:
         """Parse additional instructions to extract purpose, document type, and custom instructions"""
-        if not additional_instructions.strip():
-            return "", "", ""
-        
-        # Split by double newlines to get separate instruction blocks
-        instruction_blocks = additional_instructions.split('\n\n')
-        
-        extraction_purpose = ""
-        document_type = ""
-        custom_instructions = ""
-        
-        for block in instruction_blocks:
-            # Check if this block contains the structured purpose/document type instruction
-            if "The purpose of this extraction task is" in block and "Therefore, the document should be related to" in block:
-                # Extract purpose and document type from the structured instruction
-                import re
-                purpose_match = re.search(r"The purpose of this extraction task is (.+?)\. Therefore, the document should be related to", block)
-                doc_type_match = re.search(r"Therefore, the document should be related to (.+?)\. Do not attempt", block)
-                
-                if purpose_match:
-                    extraction_purpose = purpose_match.group(1).strip()
-                if doc_type_match:
-                    document_type = doc_type_match.group(1).strip()
-            else:
-                # This is a custom instruction block
-                if custom_instructions:
-                    custom_instructions += "\n\n" + block.strip()
-                else:
-                    custom_instructions = block.strip()
-        
-        return extraction_purpose, document_type, custom_instructions
+        return _parse_instructions(additional_instructions)
     
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about the OpenAI model being used"""
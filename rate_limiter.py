@@ -0,0 +1,122 @@
+import time
+import random
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limiter for async API requests, driven by rate limit responses and headers"""
+
+    def __init__(self, max_concurrency: int, increase_every: int = 10, target_utilization: float = 0.9):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.increase_every = increase_every  # Successful requests needed before adding a permit back
+        self.target_utilization = target_utilization  # Share of the provider's rate limit window we allow ourselves to use
+        self._in_flight = 0
+        self._successes = 0
+        self._paused_until = 0.0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
+
+    async def acquire(self) -> None:
+        """Wait for a free permit, honouring any pause requested by the provider"""
+        async with self._condition:
+            while True:
+                delay = self._paused_until - time.monotonic()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                if self._in_flight < self.limit:
+                    self._in_flight += 1
+                    return
+
+                await self._condition.wait()
+
+    async def release(self) -> None:
+        """Return a permit"""
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    async def record_success(self, remaining_ratio: Optional[float] = None, reset_after: Optional[float] = None) -> None:
+        """Grow the limit additively and pause when the provider's remaining budget runs low"""
+        async with self._condition:
+            self._successes += 1
+            if self._successes >= self.increase_every and self.limit < self.max_concurrency:
+                self.limit += 1
+                self._successes = 0
+                self._condition.notify_all()
+
+            if remaining_ratio is not None and reset_after and remaining_ratio <= 1.0 - self.target_utilization:
+                logger.info(f"Rate limit budget nearly used ({remaining_ratio:.0%} left), pausing for {reset_after:.1f}s")
+                self._paused_until = max(self._paused_until, time.monotonic() + reset_after)
+
+    async def record_rate_limited(self, retry_after: float) -> None:
+        """Halve the limit and pause new requests after a rate limit error"""
+        async with self._condition:
+            self.limit = max(1, self.limit // 2)
+            self._successes = 0
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            logger.warning(f"Rate limited: concurrency reduced to {self.limit}, pausing for {retry_after:.1f}s")
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at a per-minute rate, for client-side RPM/TPM limits"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0  # Tokens added per second
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait until the bucket holds enough tokens, then take them"""
+        amount = min(amount, self.capacity)  # Larger requests would otherwise never fit
+        async with self._lock:  # Waiters are served in order, so big requests aren't starved
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+
+
+def backoff_delay(attempt: int, initial: float = 1.0, maximum: float = 60.0) -> float:
+    """Exponential backoff with jitter for a 0-based retry attempt"""
+    return min(maximum, initial * (2 ** attempt) + random.uniform(0, 1))
+
+
+def parse_retry_after(headers, default: float = 1.0) -> float:
+    """Read the Retry-After header as seconds"""
+    try:
+        return max(0.0, float(headers.get('retry-after')))
+    except (TypeError, ValueError):
+        return default
+
+
+def seconds_until(timestamp: Optional[str]) -> Optional[float]:
+    """Convert an RFC 3339 reset timestamp into seconds from now"""
+    if not timestamp:
+        return None
+    try:
+        reset_at = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return max(0.0, (reset_at - datetime.now(timezone.utc)).total_seconds())
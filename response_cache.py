@@ -0,0 +1,54 @@
+import os
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """Deterministic on-disk cache for LLM responses keyed by a SHA-256 hash of the request"""
+
+    def __init__(self, cache_dir: str, suffix: str = '.json'):
+        self.cache_dir = Path(cache_dir)
+        self.suffix = suffix
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Build a cache key from the components that determine the response"""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\x00')  # Separator so ("ab", "c") and ("a", "bc") hash differently
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        """Get the file path for a cache key"""
+        return self.cache_dir / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for a key, or None on a miss"""
+        try:
+            return self._entry_path(key).read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Could not read cache entry {key}: {e}")
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        """Store a value, writing atomically so concurrent readers never see partial entries"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(value)
+                os.replace(temp_path, self._entry_path(key))
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {key}: {e}")
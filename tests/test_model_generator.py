@@ -0,0 +1,29 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_generator import ModelGenerator
+
+
+class CleanGeneratedCodeTest(unittest.TestCase):
+    def setUp(self):
+        # Cleaning needs no API client, so skip __init__
+        self.generator = ModelGenerator.__new__(ModelGenerator)
+    
+    def test_unfenced_code_with_trailing_prose_compiles(self):
+        code = "from pydantic import BaseModel\nclass A(BaseModel):\n    x: str\n\nThis model defines the fields requested."
+        cleaned = self.generator._clean_generated_code(code)
+        self.assertNotIn("This model defines", cleaned)
+        compile(cleaned, "<generated>", "exec")
+    
+    def test_fenced_code_drops_surrounding_prose(self):
+        code = "Here is the model:\n```python\nfrom pydantic import BaseModel\nclass A(BaseModel):\n    x: str\n```\nLet me know if you need changes."
+        cleaned = self.generator._clean_generated_code(code)
+        self.assertNotIn("Let me know", cleaned)
+        compile(cleaned, "<generated>", "exec")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,24 +5,28 @@ Combined configuration and extraction interface.
 """
 
 import streamlit as st
-import json
 import os
-import glob
+import copy
+import re
+import shutil
+import html
 from typing import Dict, List, Any, Optional
-import pandas as pd
-from datetime import datetime
-import time
+from datetime import datetime, timezone
+import uuid
+from dataclasses import dataclass, asdict, field as dataclass_field
 import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+from enum import Enum
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Import our modules
-from model_generator import ModelGenerator
-from document_parser import DocumentParser
-from openai_extractor import OpenAIExtractor
-from claude_extractor import ClaudeExtractor
+# Import our modules; the generator, parser and extractors (and their SDKs) are imported when an extraction runs,
+# like pandas when results are shown and tkinter when the folder dialog opens
+import json_utils
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -31,46 +35,63 @@ logger = logging.getLogger(__name__)
 CLAUDE_MODEL_NAME = os.getenv('CLAUDE_MODEL_NAME')
 GPT_MODEL_NAME = os.getenv('OPENAI_MODEL_NAME')
 
+# Streamlit 1.52 accepts a callable as download_button data and only calls it when the button is clicked
+_DEFERRED_DOWNLOADS = tuple(int(part) for part in st.__version__.split('.')[:2]) >= (1, 52)
+
+# Structured purpose/document type instruction built by build_additional_instructions, and the patterns that parse it back
+_PURPOSE_INSTRUCTION_TEMPLATE = (
+    "The purpose of this extraction task is {purpose}. "
+    "Therefore, the document should be related to {document_type}. "
+    "Do not attempt to extract data from non-related documents. "
+    "If the documents are not related, output 'n/a' for all fields."
+)
+_PURPOSE_RE = re.compile(r"The purpose of this extraction task is (.+?)\. Therefore, the document should be related to")
+_DOC_TYPE_RE = re.compile(r"Therefore, the document should be related to (.+?)\. Do not attempt")
+
+# Use case folder names: separators become underscores, then anything else that isn't alphanumeric or '_' is dropped
+_SAFE_NAME_TABLE = str.maketrans({' ': '_', '-': '_', '/': '_', '\\': '_'})
+_UNSAFE_NAME_RE = re.compile(r'\W+')  # Unicode aware, so accented letters are kept like str.isalnum kept them
+
 def get_api_config():
     """Get API configuration based on whether Azure endpoint is selected"""
-    import os
-    use_azure = st.session_state.get('use_azure', False)
+    # Copied so a caller can't modify the configuration shared across sessions
+    return dict(_resolve_api_config(st.session_state.get('use_azure', False)))
+
+@st.cache_resource(show_spinner=False)
+def _resolve_api_config(use_azure: bool) -> Dict[str, Any]:
+    """Resolve the API configuration from secrets or environment variables, once per process"""
+    secrets = _load_secrets()
+    
+    def setting(name: str) -> Optional[str]:
+        # Secrets first, then fall back to environment variables
+        return secrets[name] if name in secrets else os.getenv(name)
     
     if use_azure:
-        # Try secrets first, then fall back to environment variables
-        try:
-            azure_api_key = st.secrets["AZURE_API_KEY"]
-            azure_open_ai_model_name = st.secrets["OPENAI_MODEL_NAME"]
-            azure_endpoint = st.secrets["AZURE_ENDPOINT"]
-            azure_api_version = st.secrets["AZURE_API_VERSION"]
-        except:
-            azure_api_key = os.getenv('AZURE_API_KEY')
-            azure_open_ai_model_name = os.getenv("OPENAI_MODEL_NAME")
-            azure_endpoint = os.getenv("AZURE_ENDPOINT")
-            azure_api_version = os.getenv("AZURE_API_VERSION")
-            
         return {
             'use_azure': True,
-            'api_key': azure_api_key,
-            'azure_endpoint': azure_endpoint,
-            'api_version': azure_api_version,
-            'model': azure_open_ai_model_name,  # Chat completion model
+            'api_key': setting('AZURE_API_KEY'),
+            'azure_endpoint': setting('AZURE_ENDPOINT'),
+            'api_version': setting('AZURE_API_VERSION'),
+            'model': setting('OPENAI_MODEL_NAME'),  # Chat completion model
         }
     else:
-        # Try secrets first, then fall back to environment variables
-        try:
-            openai_api_key = st.secrets["OPENAI_API_KEY"]
-            open_ai_model_name = st.secrets["OPENAI_MODEL_NAME"]
-        except:
-            openai_api_key = os.getenv('OPENAI_API_KEY')
-            openai_ai_model_name = os.getenv('OPENAI_MODEL_NAME')
-            
         return {
             'use_azure': False,
-            'api_key': openai_api_key,
-            'model': open_ai_model_name,  # Chat completion model
+            'api_key': setting('OPENAI_API_KEY'),
+            'model': setting('OPENAI_MODEL_NAME'),  # Chat completion model
         }
 
+def _load_secrets() -> Dict[str, Any]:
+    """Read the Streamlit secrets, or nothing when no secrets file is configured"""
+    try:
+        return st.secrets.to_dict()
+    except FileNotFoundError:
+        # Raised (or a subclass of it) when there is no secrets.toml
+        return {}
+    except Exception as e:
+        logger.error(f"Error reading Streamlit secrets, using environment variables: {e}")
+        return {}
+
 # Page configuration
 st.set_page_config(
     page_title="Knowledge Extraction Agent",
@@ -80,7 +101,7 @@ st.set_page_config(
 )
 
 # Custom CSS for compact, appealing design
-st.markdown("""
+_CUSTOM_CSS = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -98,14 +119,6 @@ st.markdown("""
         padding-left: 1rem;
         font-weight: bold;
     }
-    .field-container {
-        background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
-        border-radius: 12px;
-        padding: 1.5rem;
-        margin: 1rem 0;
-        border: 1px solid #dee2e6;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
     .success-box {
         background: linear-gradient(135deg, #d4edda 0%, #c3e6cb 100%);
         border: 1px solid #c3e6cb;
@@ -153,14 +166,6 @@ st.markdown("""
         border: 1px solid #e0e0e0;
         text-align: center;
     }
-    .results-container {
-        background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
-        border-radius: 12px;
-        padding: 2rem;
-        margin: 2rem 0;
-        border: 2px solid #28a745;
-        box-shadow: 0 4px 12px rgba(40, 167, 69, 0.15);
-    }
     .results-header {
         font-size: 1.5rem;
         color: #28a745;
@@ -170,20 +175,6 @@ st.markdown("""
         border-bottom: 2px solid #28a745;
         padding-bottom: 0.5rem;
     }
-    .result-summary {
-        background: white;
-        border-radius: 8px;
-        padding: 1rem;
-        margin: 1rem 0;
-        border: 1px solid #dee2e6;
-    }
-    .download-container {
-        background: linear-gradient(135deg, #e3f2fd 0%, #bbdefb 100%);
-        border-radius: 8px;
-        padding: 1.5rem;
-        margin: 1rem 0;
-        border: 1px solid #2196f3;
-    }
     .certificate-green {
         background: linear-gradient(135deg, #d4edda 0%, #c3e6cb 100%);
         border: 2px solid #28a745;
@@ -207,59 +198,55 @@ st.markdown("""
         box-shadow: 0 4px 8px rgba(220, 53, 69, 0.2);
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+def inject_custom_css():
+    """Add the custom CSS to the page"""
+    st.markdown(_CUSTOM_CSS, unsafe_allow_html=True)
+
+# Session state defaults, applied once per session
+_SESSION_DEFAULTS = {
+    'current_tab': "Configuration",
+    'fields': [],
+    'use_case': "",
+    'description': "",
+    'main_model_name': "",
+    'additional_instructions': "",
+    'extraction_purpose': "",
+    'document_type': "",
+    'custom_instructions': "",
+    'selected_files': [],
+    'extraction_results': None,
+    'rebuild_models': False,
+    'model_generation_model': None,
+    'extraction_model': None,
+    'use_azure': False,
+}
 
 def initialize_session_state():
     """Initialize session state variables"""
-    if 'current_tab' not in st.session_state:
-        st.session_state.current_tab = "Configuration"
-    if 'fields' not in st.session_state:
-        st.session_state.fields = []
-    if 'use_case' not in st.session_state:
-        st.session_state.use_case = ""
-    if 'description' not in st.session_state:
-        st.session_state.description = ""
-    if 'main_model_name' not in st.session_state:
-        st.session_state.main_model_name = ""
-    if 'additional_instructions' not in st.session_state:
-        st.session_state.additional_instructions = ""
-    if 'extraction_purpose' not in st.session_state:
-        st.session_state.extraction_purpose = ""
-    if 'document_type' not in st.session_state:
-        st.session_state.document_type = ""
-    if 'custom_instructions' not in st.session_state:
-        st.session_state.custom_instructions = ""
-    if 'selected_files' not in st.session_state:
-        st.session_state.selected_files = []
-    if 'extraction_results' not in st.session_state:
-        st.session_state.extraction_results = None
-    if 'rebuild_models' not in st.session_state:
-        st.session_state.rebuild_models = False
-    if 'model_generation_model' not in st.session_state:
-        st.session_state.model_generation_model = None
-    if 'extraction_model' not in st.session_state:
-        st.session_state.extraction_model = None
-    if 'use_azure' not in st.session_state:
-        st.session_state.use_azure = False
+    for key, default in _SESSION_DEFAULTS.items():
+        if key not in st.session_state:
+            # Copied so sessions never share a mutable default such as the fields list
+            st.session_state[key] = copy.copy(default)
 
 def ensure_use_cases_folder():
     """Ensure Use-cases folder exists at application start"""
     use_cases_dir = "Use-cases"
-    if not os.path.exists(use_cases_dir):
-        os.makedirs(use_cases_dir)
+    if not os.path.isdir(use_cases_dir):
+        os.makedirs(use_cases_dir, exist_ok=True)
         st.success(f"✅ Created {use_cases_dir} folder")
     return use_cases_dir
 
 def create_use_case_folder(use_case_name: str) -> str:
     """Create folder for specific use case"""
-    use_cases_dir = ensure_use_cases_folder()
     # Create safe folder name
-    safe_name = use_case_name.replace(' ', '_').replace('-', '_').replace('/', '_').replace('\\', '_')
-    safe_name = ''.join(c for c in safe_name if c.isalnum() or c == '_')
+    safe_name = _UNSAFE_NAME_RE.sub('', use_case_name.translate(_SAFE_NAME_TABLE))
     
-    use_case_folder = os.path.join(use_cases_dir, safe_name)
-    if not os.path.exists(use_case_folder):
-        os.makedirs(use_case_folder)
+    # makedirs creates Use-cases along with it, so path lookups skip the top-level check and never render a message
+    use_case_folder = os.path.join("Use-cases", safe_name)
+    if not os.path.isdir(use_case_folder):
+        os.makedirs(use_case_folder, exist_ok=True)
     
     return use_case_folder
 
@@ -268,6 +255,18 @@ def get_use_case_path(use_case_name: str, filename: str) -> str:
     use_case_folder = create_use_case_folder(use_case_name)
     return os.path.join(use_case_folder, filename)
 
+@st.cache_data(show_spinner=False, max_entries=32)
+def _read_config(config_path: str, file_stat: tuple) -> Dict[str, Any]:
+    """Parse a config.json file; file_stat keys the cache so edits on disk are picked up"""
+    with open(config_path, 'rb') as f:
+        return json_utils.loads(f.read())
+
+def read_config(config_path: str) -> Dict[str, Any]:
+    """Read a config.json file, reusing the parsed content while the file is unchanged"""
+    config_stat = os.stat(config_path)
+    # cache_data hands out a copy, so callers may modify the result freely
+    return _read_config(os.path.abspath(config_path), (config_stat.st_mtime_ns, config_stat.st_size))
+
 def load_extraction_context_from_current_config():
     """Load extraction context from the current configuration for the extraction phase"""
     if not st.session_state.use_case:
@@ -277,21 +276,20 @@ def load_extraction_context_from_current_config():
         # Get the config file path for current use case
         config_path = get_use_case_path(st.session_state.use_case, "config.json")
         if os.path.exists(config_path):
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-                extraction_config = config_data.get('extraction_config', {})
-                
-                # Load the three extraction context fields
-                st.session_state.extraction_purpose = extraction_config.get('purpose_of_extraction', '')
-                
-                # Handle document_type - remove the appended warning if present
-                doc_type_raw = extraction_config.get('document_type', '')
-                if ". Do not attempt to extract data from non-related documents" in doc_type_raw:
-                    st.session_state.document_type = doc_type_raw.split(". Do not attempt to extract data from non-related documents")[0]
-                else:
-                    st.session_state.document_type = doc_type_raw
-                
-                st.session_state.custom_instructions = extraction_config.get('additional_instructions', '')
+            config_data = read_config(config_path)
+            extraction_config = config_data.get('extraction_config', {})
+            
+            # Load the three extraction context fields
+            st.session_state.extraction_purpose = extraction_config.get('purpose_of_extraction', '')
+            
+            # Handle document_type - remove the appended warning if present
+            doc_type_raw = extraction_config.get('document_type', '')
+            if ". Do not attempt to extract data from non-related documents" in doc_type_raw:
+                st.session_state.document_type = doc_type_raw.split(". Do not attempt to extract data from non-related documents")[0]
+            else:
+                st.session_state.document_type = doc_type_raw
+            
+            st.session_state.custom_instructions = extraction_config.get('additional_instructions', '')
     except Exception as e:
         # If there's any error loading, just use empty defaults
         st.session_state.extraction_purpose = ""
@@ -308,8 +306,7 @@ def save_extraction_context_to_config():
         config_path = get_use_case_path(st.session_state.use_case, "config.json")
         if os.path.exists(config_path):
             # Load existing config
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
+            config_data = read_config(config_path)
             
             # Update the extraction context fields
             extraction_config = config_data.get('extraction_config', {})
@@ -328,8 +325,9 @@ def save_extraction_context_to_config():
             logging.info(f"Saving extraction context: purpose='{purpose}', doc_type='{doc_type}', custom='{custom}'")
             
             # Save updated config back to file
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, indent=2, ensure_ascii=False)
+            with open(config_path, 'wb') as f:
+                f.write(json_utils.dumps_bytes(config_data, indent=True))
+            _read_config.clear()
     except Exception as e:
         # Log the error for debugging
         import logging
@@ -338,30 +336,38 @@ def save_extraction_context_to_config():
 
 def build_additional_instructions() -> str:
     """Build combined additional instructions from the three components"""
+    return _build_additional_instructions(
+        st.session_state.extraction_purpose.strip(),
+        st.session_state.document_type.strip(),
+        st.session_state.custom_instructions.strip()
+    )
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _build_additional_instructions(purpose: str, document_type: str, custom_instructions: str) -> str:
+    """Combine the stripped instruction components"""
     instructions = []
     
     # Add structured purpose and document type instruction
-    if st.session_state.extraction_purpose.strip() and st.session_state.document_type.strip():
-        purpose_instruction = (
-            f"The purpose of this extraction task is {st.session_state.extraction_purpose.strip()}. "
-            f"Therefore, the document should be related to {st.session_state.document_type.strip()}. "
-            f"Do not attempt to extract data from non-related documents. "
-            f"If the documents are not related, output 'n/a' for all fields."
-        )
-        instructions.append(purpose_instruction)
+    if purpose and document_type:
+        instructions.append(_PURPOSE_INSTRUCTION_TEMPLATE.format(purpose=purpose, document_type=document_type))
     
     # Add custom instructions if provided
-    if st.session_state.custom_instructions.strip():
-        instructions.append(st.session_state.custom_instructions.strip())
+    if custom_instructions:
+        instructions.append(custom_instructions)
     
     return '\n\n'.join(instructions)
 
 def validate_azure_configuration() -> tuple[bool, str, str]:
     """Validate Azure configuration and return status, message, and CSS class"""
-    use_azure = st.session_state.get('use_azure', False)
-    generation_model = st.session_state.get('model_generation_model')
-    extraction_model = st.session_state.get('extraction_model')
-    
+    return _validate_azure_configuration(
+        st.session_state.get('use_azure', False),
+        st.session_state.get('model_generation_model'),
+        st.session_state.get('extraction_model')
+    )
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _validate_azure_configuration(use_azure: bool, generation_model: Optional[str], extraction_model: Optional[str]) -> tuple[bool, str, str]:
+    """Validate an endpoint and model combination"""
     if not use_azure:
         return True, "", ""
     
@@ -403,9 +409,8 @@ def parse_additional_instructions(combined_instructions: str):
         # Check if this block contains the structured purpose/document type instruction
         if "The purpose of this extraction task is" in block and "Therefore, the document should be related to" in block:
             # Extract purpose and document type from the structured instruction
-            import re
-            purpose_match = re.search(r"The purpose of this extraction task is (.+?)\. Therefore, the document should be related to", block)
-            doc_type_match = re.search(r"Therefore, the document should be related to (.+?)\. Do not attempt", block)
+            purpose_match = _PURPOSE_RE.search(block)
+            doc_type_match = _DOC_TYPE_RE.search(block)
             
             if purpose_match:
                 extraction_purpose = purpose_match.group(1).strip()
@@ -420,133 +425,240 @@ def parse_additional_instructions(combined_instructions: str):
     
     return extraction_purpose, document_type, custom_instructions
 
-def load_saved_models() -> List[Dict[str, str]]:
-    """Load list of saved model configurations from Use-cases folders"""
-    models = []
+def _use_cases_fingerprint() -> tuple:
+    """Cheap fingerprint of the saved use cases: modification time and size of each folder's config.json"""
     use_cases_dir = "Use-cases"
+    fingerprint = []
     
     if os.path.exists(use_cases_dir):
-        for use_case_folder in os.listdir(use_cases_dir):
-            folder_path = os.path.join(use_cases_dir, use_case_folder)
-            if os.path.isdir(folder_path):
-                # Look for config.json in each use case folder
-                config_file = os.path.join(folder_path, "config.json")
-                if os.path.exists(config_file):
+        with os.scandir(use_cases_dir) as entries:
+            for entry in entries:
+                if entry.is_dir():
                     try:
-                        with open(config_file, 'r', encoding='utf-8') as f:
-                            config_data = json.load(f)
-                            extraction_config = config_data.get('extraction_config', {})
-                            
-                            models.append({
-                                'folder': use_case_folder,
-                                'use_case': extraction_config.get('use_case', use_case_folder),
-                                'description': extraction_config.get('description', 'No description'),
-                                'model_name': extraction_config.get('main_model_name', 'Unknown'),
-                                'field_count': len(extraction_config.get('fields', [])),
-                                'created_at': extraction_config.get('created_at', 'Unknown')
-                            })
-                    except Exception as e:
-                        # Skip invalid config files
+                        config_stat = os.stat(os.path.join(entry.path, "config.json"))
+                    except OSError:
                         continue
+                    fingerprint.append((entry.name, config_stat.st_mtime_ns, config_stat.st_size))
     
-    return models
+    return tuple(sorted(fingerprint))
+
+def load_saved_models() -> List[Dict[str, str]]:
+    """Load list of saved model configurations from Use-cases folders"""
+    # Reruns only stat the config files; they are re-read when one is added, changed or removed
+    return _load_saved_models_cached(_use_cases_fingerprint())
+
+@st.cache_data(show_spinner=False)
+def _load_saved_models_cached(fingerprint: tuple) -> List[Dict[str, str]]:
+    """Read the saved model configurations matching a Use-cases fingerprint"""
+    # The fingerprint scan already found every folder holding a config.json, so no directory is listed or stat'ed again
+    use_case_folders = [use_case_folder for use_case_folder, _, _ in fingerprint]
+    if len(use_case_folders) <= 1:
+        models = map(_read_saved_model, use_case_folders)
+    else:
+        # Reading is I/O bound and releases the GIL, so the files are read concurrently
+        with ThreadPoolExecutor(max_workers=min(8, len(use_case_folders))) as executor:
+            models = list(executor.map(_read_saved_model, use_case_folders))
+    
+    return [model for model in models if model is not None]
+
+def _read_saved_model(use_case_folder: str) -> Optional[Dict[str, str]]:
+    """Summarize one use case's config.json for the selectbox, or None if it can't be read"""
+    config_file = os.path.join("Use-cases", use_case_folder, "config.json")
+    try:
+        with open(config_file, 'rb') as f:
+            config_data = json_utils.loads(f.read())
+        extraction_config = config_data.get('extraction_config', {})
+        
+        return {
+            'folder': use_case_folder,
+            'use_case': extraction_config.get('use_case', use_case_folder),
+            'description': extraction_config.get('description', 'No description'),
+            'model_name': extraction_config.get('main_model_name', 'Unknown'),
+            'field_count': len(extraction_config.get('fields', [])),
+            'created_at': extraction_config.get('created_at', 'Unknown')
+        }
+    except Exception as e:
+        # Skip invalid or since removed config files
+        return None
+
+def load_saved_model_options() -> tuple:
+    """Get the use case selectbox options and the saved model behind each display name"""
+    return _saved_model_options_cached(_use_cases_fingerprint())
+
+@st.cache_data(show_spinner=False)
+def _saved_model_options_cached(fingerprint: tuple) -> tuple:
+    """Build the selectbox options for the saved models matching a Use-cases fingerprint"""
+    model_options = ["🆕 Create New Use Case"]
+    model_display_names = {}
+    
+    for model in _load_saved_models_cached(fingerprint):
+        display_name = f"📁 {model['use_case']} ({model['model_name']}) - {model['field_count']} fields"
+        model_options.append(display_name)
+        model_display_names[display_name] = model
+    
+    return model_options, model_display_names
 
 def save_model_config(config_data: Dict[str, Any], use_case_name: str):
     """Save model configuration to use-case folder"""
     config_path = get_use_case_path(use_case_name, "config.json")
-    with open(config_path, 'w', encoding='utf-8') as f:
-        json.dump(config_data, f, indent=2, ensure_ascii=False)
+    with open(config_path, 'wb') as f:
+        f.write(json_utils.dumps_bytes(config_data, indent=True))
+    # The file stat would catch this too, unless the rewrite lands within the filesystem's timestamp resolution
+    _load_saved_models_cached.clear()
+    _saved_model_options_cached.clear()
+    _read_config.clear()
     return config_path
 
 def load_model_config(relative_path: str) -> Dict[str, Any]:
     """Load model configuration from use-case folder"""
     full_path = os.path.join("Use-cases", relative_path)
-    with open(full_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return read_config(full_path)
+
+@dataclass(slots=True)
+class Field:
+    """One extraction field being edited in the configuration section"""
+    field_name: str = ""
+    field_type: str = "str"
+    description: str = ""
+    required: bool = True
+    enum_values: Optional[List[str]] = None
+    # Stable id; the field's editor widgets are keyed by it rather than by position
+    id: str = dataclass_field(default_factory=lambda: uuid.uuid4().hex)
+    
+    def to_config(self) -> Dict[str, Any]:
+        """Field entry as stored in config.json"""
+        config = asdict(self)
+        del config['id']
+        config['enum_values'] = self.enum_values or None
+        return config
+
+def _field_from_config(field: Dict[str, Any]) -> Field:
+    """Convert a config.json field entry into an editable field"""
+    return Field(
+        field_name=field.get('field_name', ''),
+        field_type=field.get('field_type', 'str'),
+        description=field.get('description', ''),
+        required=field.get('required', True),
+        enum_values=field.get('enum_values')
+    )
 
-def create_field_form(field_index: int, field_data: Optional[Dict] = None):
+# Field attributes edited in the fields form, in widget order
+_FIELD_ATTRIBUTES = ('field_name', 'description', 'enum_values', 'field_type', 'required')
+
+def _field_widget_key(field_id: str, attribute: str) -> str:
+    """Session state key of a field editor widget"""
+    return f"field:{field_id}:{attribute}"
+
+def _add_field():
+    """Append an empty field to the configuration, keeping the edits submitted with it"""
+    _sync_fields()
+    st.session_state.fields.append(Field())
+
+def _remove_field(field_id: str):
+    """Remove a field from the configuration, keeping the edits submitted with it"""
+    _sync_fields()
+    st.session_state.fields = [field for field in st.session_state.fields if field.id != field_id]
+
+def _sync_fields():
+    """Copy the submitted fields form values into the fields"""
+    for field in st.session_state.fields:
+        for attribute in _FIELD_ATTRIBUTES:
+            widget_key = _field_widget_key(field.id, attribute)
+            if widget_key not in st.session_state:
+                continue
+            value = st.session_state[widget_key]
+            if attribute == 'enum_values':
+                value = [cat.strip() for cat in value.split('\n') if cat.strip()] or None
+            setattr(field, attribute, value)
+
+def create_field_form(field_index: int, field_data: Field):
     """Create a compact form for a single field configuration"""
+    field_id = field_data.id
     
-    with st.container():
-        st.markdown(f'<div class="field-container">', unsafe_allow_html=True)
-        
+    def widget_key(attribute: str) -> str:
+        return _field_widget_key(field_id, attribute)
+    
+    # A bordered container holds the field's widgets; an opening div in its own markdown element can't wrap them
+    with st.container(border=True):
         col_header, col_remove = st.columns([4, 1])
         with col_header:
             st.markdown(f"**📝 Field {field_index + 1}**")
         with col_remove:
-            if st.button("🗑️", key=f"remove_{field_index}", help="Remove field"):
-                st.session_state.fields.pop(field_index)
-                st.rerun()
+            st.form_submit_button("🗑️", key=widget_key('remove'), help="Remove field", on_click=_remove_field, args=(field_id,))
         
         # Four equal-width columns for the four attributes
         col1, col2, col3, col4 = st.columns(4)
         
+        # The fields form copies widget values into the field on submit; value= restores them after the tab was switched away
         with col1:
-            field_name = st.text_input(
+            st.text_input(
                 "Field Name",
-                value=field_data.get('field_name', '') if field_data else '',
-                key=f"field_name_{field_index}",
-                help="Name of the field to extract"
+                value=field_data.field_name,
+                help="Name of the field to extract",
+                key=widget_key('field_name')
             )
         
         with col2:
-            field_description = st.text_area(
+            st.text_area(
                 "Field Description",
-                value=field_data.get('description', '') if field_data else '',
-                key=f"description_{field_index}",
+                value=field_data.description,
                 height=80,
-                help="What information to extract"
+                help="What information to extract",
+                key=widget_key('description')
             )
         
         with col3:
             # Categories/Classes (optional)
-            categories_input = st.text_area(
+            st.text_area(
                 "Categories/Classes (Optional)",
-                value='\n'.join(field_data.get('enum_values', [])) if field_data and field_data.get('enum_values') else '',
-                key=f"categories_{field_index}",
+                value='\n'.join(field_data.enum_values or []),
                 height=80,
-                help="One category per line for classification"
+                help="One category per line for classification",
+                key=widget_key('enum_values')
             )
-            categories = [cat.strip() for cat in categories_input.split('\n') if cat.strip()] if categories_input.strip() else None
         
         with col4:
             # Determine if this should be enum based on categories
             available_types = ['str', 'int', 'float', 'bool', 'list[str]']
-            if categories:
+            if field_data.enum_values:
                 available_types.extend(['enum', 'list[enum]'])
             
-            current_type = field_data.get('field_type', 'str') if field_data else 'str'
-            if current_type not in available_types:
-                current_type = 'str'
+            if field_data.field_type not in available_types:
+                field_data.field_type = 'str'
             
-            field_type = st.selectbox(
+            st.selectbox(
                 "Data Type",
                 options=available_types,
-                index=available_types.index(current_type),
-                key=f"field_type_{field_index}",
-                help="Choose appropriate data type"
+                index=available_types.index(field_data.field_type),
+                help="Choose appropriate data type",
+                key=widget_key('field_type')
             )
         
         # Required checkbox (full width)
-        required = st.checkbox(
+        st.checkbox(
             "Required Field",
-            value=field_data.get('required', True) if field_data else True,
-            key=f"required_{field_index}"
+            value=field_data.required,
+            key=widget_key('required')
         )
-        
-        # Update session state
-        st.session_state.fields[field_index] = {
-            'field_name': field_name,
-            'field_type': field_type,
-            'description': field_description,
-            'required': required,
-            'enum_values': categories
-        }
-        
-        st.markdown('</div>', unsafe_allow_html=True)
 
 def validate_configuration() -> tuple[bool, List[str]]:
     """Validate the current configuration"""
+    # Everything the checks read; reruns that didn't change any of it reuse the last result
+    validation_key = (
+        st.session_state.use_case,
+        st.session_state.main_model_name,
+        tuple((field.field_name, field.field_type, field.description, bool(field.enum_values)) for field in st.session_state.fields)
+    )
+    cached = st.session_state.get('_validation_cache')
+    if cached is not None and cached[0] == validation_key:
+        return cached[1]
+    
+    result = _validate_configuration()
+    st.session_state['_validation_cache'] = (validation_key, result)
+    return result
+
+def _validate_configuration() -> tuple[bool, List[str]]:
+    """Run the configuration checks"""
     errors = []
     
     if not st.session_state.use_case.strip():
@@ -558,35 +670,29 @@ def validate_configuration() -> tuple[bool, List[str]]:
     if not st.session_state.fields:
         errors.append("At least one field is required")
     
-    field_names = []
+    field_names = set()
     for i, field in enumerate(st.session_state.fields):
-        if not field.get('field_name', '').strip():
+        if not field.field_name.strip():
             errors.append(f"Field {i+1}: Field name is required")
         else:
-            if field['field_name'] in field_names:
-                errors.append(f"Field {i+1}: Duplicate field name '{field['field_name']}'")
-            field_names.append(field['field_name'])
+            if field.field_name in field_names:
+                errors.append(f"Field {i+1}: Duplicate field name '{field.field_name}'")
+            field_names.add(field.field_name)
         
-        if not field.get('description', '').strip():
+        if not field.description.strip():
             errors.append(f"Field {i+1}: Description is required")
         
-        if field.get('field_type') in ['enum', 'list[enum]'] and not field.get('enum_values'):
+        if field.field_type in ['enum', 'list[enum]'] and not field.enum_values:
             errors.append(f"Field {i+1}: Categories are required for enum types")
     
     return len(errors) == 0, errors
 
-def export_configuration() -> Dict[str, Any]:
-    """Export the current configuration"""
-    fields_config = []
-    for field in st.session_state.fields:
-        field_config = {
-            'field_name': field['field_name'],
-            'field_type': field['field_type'],
-            'description': field['description'],
-            'required': field['required'],
-            'enum_values': field['enum_values'] if field.get('enum_values') else None
-        }
-        fields_config.append(field_config)
+def export_configuration(created_at: Optional[str] = None) -> Dict[str, Any]:
+    """Export the current configuration, stamped with created_at (the current UTC time by default)"""
+    if created_at is None:
+        created_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    
+    fields_config = [field.to_config() for field in st.session_state.fields]
     
     config = {
         'extraction_config': {
@@ -596,35 +702,90 @@ def export_configuration() -> Dict[str, Any]:
             'purpose_of_extraction': st.session_state.extraction_purpose.strip() if st.session_state.extraction_purpose.strip() else "",
             'document_type': f"{st.session_state.document_type.strip()}" if st.session_state.document_type.strip() else "",
             'additional_instructions': st.session_state.custom_instructions.strip() if st.session_state.custom_instructions.strip() else "",
-            'created_at': datetime.now().isoformat(),
+            'created_at': created_at,
             'fields': fields_config
         }
     }
     
     return config
 
+def _suggest_model_name():
+    """Derive the model class name from the use case name"""
+    if st.session_state.use_case:
+        suggested = st.session_state.use_case.replace(' ', '').replace('-', '').replace('_', '')
+        if not suggested.endswith('Info'):
+            suggested += 'Info'
+        st.session_state.main_model_name = suggested
+
+def _sync_use_azure():
+    """Copy the Azure checkbox into use_azure, which outlives the widget when the tab is switched"""
+    st.session_state.use_azure = st.session_state.use_azure_checkbox
+
+def _switch_tab(tab: str):
+    """Show another tab, loading the extraction context from the saved configuration when switching to Extraction"""
+    if tab == "Extraction":
+        load_extraction_context_from_current_config()
+    st.session_state.current_tab = tab
+
+def _browse_for_folder():
+    """Pick the documents folder with a native dialog"""
+    # Use tkinter for folder selection dialog
+    try:
+        import tkinter as tk
+        from tkinter import filedialog
+        
+        # Create a root window and hide it
+        root = tk.Tk()
+        root.withdraw()
+        root.attributes('-topmost', True)
+        
+        # Open folder dialog
+        selected_folder = filedialog.askdirectory(
+            title="Select Folder Containing Documents"
+        )
+        
+        # Destroy the root window
+        root.destroy()
+        
+        if selected_folder:
+            st.session_state.selected_folder_path = selected_folder
+            # Dropping the input's widget state makes it show the new path as its value
+            st.session_state.pop('folder_path_input', None)
+    except ImportError:
+        st.error("❌ Folder dialog not available. Please enter path manually.")
+    except Exception as e:
+        st.error(f"❌ Error opening folder dialog: {str(e)}")
+
+def _configuration_download_bytes() -> bytes:
+    """Serialized configuration for the download button, rebuilt only when the configuration changes"""
+    config_key = (
+        st.session_state.use_case,
+        st.session_state.description,
+        st.session_state.main_model_name,
+        st.session_state.extraction_purpose,
+        st.session_state.document_type,
+        st.session_state.custom_instructions,
+        tuple((field.field_name, field.field_type, field.description, field.required, tuple(field.enum_values or ())) for field in st.session_state.fields)
+    )
+    cached = st.session_state.get('_config_download')
+    if cached is not None and cached[0] == config_key:
+        return cached[1]
+    
+    # created_at is when this version of the configuration was first offered for download
+    config_json = json_utils.dumps_bytes(export_configuration(), indent=True)
+    st.session_state['_config_download'] = (config_key, config_json)
+    return config_json
+
 def configuration_section():
     """Configuration section of the UI"""
     st.markdown('<div class="section-header">🔧 Use Case Configuration</div>', unsafe_allow_html=True)
     
-    # Ensure Use-cases folder exists
-    ensure_use_cases_folder()
-    
-    # Model selection or creation with enhanced display
-    saved_models = load_saved_models()
+    # Model selection or creation with enhanced display; options with detailed descriptions are rebuilt only when the saved models change
+    model_options, model_display_names = load_saved_model_options()
     
-    if saved_models:
+    if model_display_names:
         st.markdown("**📋 Available Use Cases**")
         
-        # Create selection options with detailed descriptions
-        model_options = ["🆕 Create New Use Case"]
-        model_display_names = {}
-        
-        for model in saved_models:
-            display_name = f"📁 {model['use_case']} ({model['model_name']}) - {model['field_count']} fields"
-            model_options.append(display_name)
-            model_display_names[display_name] = model
-        
         selected_option = st.selectbox(
             "Choose an extraction use case to load or create new",
             model_options,
@@ -679,7 +840,7 @@ def configuration_section():
                         # Build combined instructions for backward compatibility
                         st.session_state.additional_instructions = build_additional_instructions()
                         
-                        st.session_state.fields = extraction_config.get('fields', [])
+                        st.session_state.fields = [_field_from_config(field) for field in extraction_config.get('fields', [])]
                         
                         st.success(f"✅ Loaded model: {selected_model['use_case']}")
                         st.rerun()
@@ -689,7 +850,6 @@ def configuration_section():
                 if st.button("🗑️ Delete Model"):
                     try:
                         folder_path = f"Use-cases/{selected_model['folder']}"
-                        import shutil
                         shutil.rmtree(folder_path)
                         st.success(f"✅ Deleted model: {selected_model['use_case']}")
                         st.rerun()
@@ -724,13 +884,8 @@ def configuration_section():
             help="What you're extracting and why"
         )
         
-        if st.button("🔤 Auto-Generate Model Name"):
-            if st.session_state.use_case:
-                suggested = st.session_state.use_case.replace(' ', '').replace('-', '').replace('_', '')
-                if not suggested.endswith('Info'):
-                    suggested += 'Info'
-                st.session_state.main_model_name = suggested
-                st.rerun()
+        # The callback runs before the rerun, so the Model Name input above already shows the suggestion
+        st.button("🔤 Auto-Generate Model Name", on_click=_suggest_model_name)
     
     # Model Selection Settings
     st.markdown("**⚙️ Model Settings**")
@@ -792,15 +947,14 @@ def configuration_section():
             )
     
     with col3:
-        st.session_state.use_azure = st.checkbox(
+        # Synced by callback before the rerun, so the extraction options to the left already match a toggle
+        st.checkbox(
             "Use Microsoft Azure Endpoint",
             value=st.session_state.get('use_azure', False),
-            help="Select for secure data processing. Requires MS AZURE API key"
+            help="Select for secure data processing. Requires MS AZURE API key",
+            key="use_azure_checkbox",
+            on_change=_sync_use_azure
         )
-        
-        # Force a re-run if Azure selection changes compatibility
-        if azure_enabled and st.session_state.extraction_model not in ([GPT_MODEL_NAME] if GPT_MODEL_NAME else []):
-            st.rerun()
 
     # Azure Configuration Validation and Certificate Display
     is_valid, message, css_class = validate_azure_configuration()
@@ -808,41 +962,42 @@ def configuration_section():
         st.markdown(f'<div class="{css_class}">{message}</div>', unsafe_allow_html=True)
     
     # Fields configuration
+    fields_section()
+
+@st.fragment
+def fields_section():
+    """Field editors, validation and save actions; edits rerun only this part of the page"""
     st.markdown("**📋 Extraction Fields**")
     
-    col_add, col_info = st.columns([1, 4])
-    with col_add:
-        if st.button("➕ Add Field", type="primary", key="add_field_btn"):
-            new_field = {
-                'field_name': '',
-                'field_type': 'str',
-                'description': '',
-                'required': True,
-                'enum_values': None
-            }
-            st.session_state.fields.append(new_field)
-            st.rerun()
-    
-    with col_info:
+    # Typing in a field editor doesn't rerun anything; edits are applied together when the form is submitted
+    with st.form("fields_form", clear_on_submit=False, border=False):
+        col_add, col_info = st.columns([1, 4])
+        with col_add:
+            st.form_submit_button("➕ Add Field", type="primary", key="add_field_btn", on_click=_add_field)
+        
+        with col_info:
+            if st.session_state.fields:
+                st.markdown(f"*Currently configured: {len(st.session_state.fields)} fields*")
+            else:
+                st.markdown("*No fields defined yet*")
+        
+        # Display fields
         if st.session_state.fields:
-            st.markdown(f"*Currently configured: {len(st.session_state.fields)} fields*")
-        else:
-            st.markdown("*No fields defined yet*")
-    
-    # Display fields
-    if st.session_state.fields:
-        for i, field in enumerate(st.session_state.fields):
-            create_field_form(i, field)
+            if any(isinstance(field, dict) for field in st.session_state.fields):
+                # Sessions started before fields became dataclasses
+                st.session_state.fields = [_field_from_config(field) if isinstance(field, dict) else field for field in st.session_state.fields]
+            for i, field in enumerate(st.session_state.fields):
+                create_field_form(i, field)
+            
+            st.form_submit_button("✅ Apply Field Changes", key="apply_fields_btn", on_click=_sync_fields)
     
     # Validation and save
     is_valid, errors = validate_configuration()
     
     if errors:
-        st.markdown('<div class="warning-box">', unsafe_allow_html=True)
-        st.markdown("**⚠️ Configuration Issues:**")
-        for error in errors:
-            st.markdown(f"• {error}")
-        st.markdown('</div>', unsafe_allow_html=True)
+        # One element for the whole box; errors quote user input, so they are escaped
+        error_items = "".join(f"<li>{html.escape(error)}</li>" for error in errors)
+        st.markdown(f'<div class="warning-box"><b>⚠️ Configuration Issues:</b><ul>{error_items}</ul></div>', unsafe_allow_html=True)
     
     if is_valid:
         st.markdown('<div class="success-box">✅ Configuration is ready!</div>', unsafe_allow_html=True)
@@ -860,19 +1015,17 @@ def configuration_section():
                     st.error(f"❌ Error saving: {str(e)}")
         
         with col2:
-            config = export_configuration()
-            config_json = json.dumps(config, indent=2)
             st.download_button(
                 label="📥 Download",
-                data=config_json,
+                data=_configuration_download_bytes(),
                 file_name=f"{st.session_state.use_case.replace(' ', '_').lower()}_config.json",
                 mime="application/json"
             )
         
         with col3:
+            # A callback here would only rerun this fragment, so the whole app is rerun explicitly
             if st.button("🚀 Go to Extraction", type="secondary"):
-                load_extraction_context_from_current_config()  # Load context before switching
-                st.session_state.current_tab = "Extraction"
+                _switch_tab("Extraction")
                 st.rerun()
 
 def extraction_section():
@@ -883,13 +1036,9 @@ def extraction_section():
     is_valid, _ = validate_configuration()
     
     if not is_valid:
-        st.markdown('<div class="warning-box">', unsafe_allow_html=True)
-        st.markdown("**⚠️ Please complete model configuration first**")
-        st.markdown('</div>', unsafe_allow_html=True)
+        st.markdown('<div class="warning-box"><b>⚠️ Please complete model configuration first</b></div>', unsafe_allow_html=True)
         
-        if st.button("← Back to Configuration"):
-            st.session_state.current_tab = "Configuration"
-            st.rerun()
+        st.button("← Back to Configuration", on_click=_switch_tab, args=("Configuration",))
         return
     
     # Extraction context and instructions
@@ -961,40 +1110,14 @@ def extraction_section():
             
             with col_browse:
                 st.markdown("<br>", unsafe_allow_html=True)  # Add spacing
-                if st.button("📁 Browse", help="Open folder selection dialog"):
-                    # Use tkinter for folder selection dialog
-                    try:
-                        import tkinter as tk
-                        from tkinter import filedialog
-                        
-                        # Create a root window and hide it
-                        root = tk.Tk()
-                        root.withdraw()
-                        root.attributes('-topmost', True)
-                        
-                        # Open folder dialog
-                        selected_folder = filedialog.askdirectory(
-                            title="Select Folder Containing Documents"
-                        )
-                        
-                        # Destroy the root window
-                        root.destroy()
-                        
-                        if selected_folder:
-                            st.session_state.selected_folder_path = selected_folder
-                            st.rerun()
-                    except ImportError:
-                        st.error("❌ Folder dialog not available. Please enter path manually.")
-                    except Exception as e:
-                        st.error(f"❌ Error opening folder dialog: {str(e)}")
+                st.button("📁 Browse", help="Open folder selection dialog", on_click=_browse_for_folder)
             
             # Use the session state value for folder processing
             folder_path = st.session_state.selected_folder_path
             
             if folder_path and os.path.exists(folder_path):
-                supported_files = []
-                for ext in ['.pdf', '.docx', '.doc']:
-                    supported_files.extend(glob.glob(os.path.join(folder_path, f"*{ext}")))
+                # Listed again only when the folder's contents change
+                supported_files = _scan_folder(folder_path, os.stat(folder_path).st_mtime_ns)
                 
                 if supported_files:
                     st.success(f"✅ Found {len(supported_files)} supported documents")
@@ -1019,44 +1142,46 @@ def extraction_section():
             )
             
             if uploaded_files:
-                # Save uploaded files temporarily
+                # Save uploaded files temporarily; reruns skip uploads already written to disk
+                saved_uploads = st.session_state.setdefault('_saved_uploads', {})
                 temp_files = []
                 for uploaded_file in uploaded_files:
                     temp_path = f"temp_{uploaded_file.name}"
-                    with open(temp_path, "wb") as f:
-                        f.write(uploaded_file.getbuffer())
+                    if saved_uploads.get(temp_path) != uploaded_file.file_id or not os.path.exists(temp_path):
+                        uploaded_file.seek(0)
+                        with open(temp_path, "wb", buffering=256 * 1024) as f:
+                            shutil.copyfileobj(uploaded_file, f, 1024 * 1024)
+                        saved_uploads[temp_path] = uploaded_file.file_id
                     temp_files.append(temp_path)
                 
                 st.session_state.selected_files = temp_files
                 st.success(f"✅ Selected {len(temp_files)} documents")
     
-    # Clear files button
-    if st.session_state.selected_files:
+    # Counted once for the checks and metrics below; the list stays ordered, as documents are processed in selection order
+    file_count = len(st.session_state.selected_files or ())
+    
+    if file_count:
+        # Clear files button
         if st.button("🗑️ Clear Files", help="Clear selected files and clean up temporary files"):
             _cleanup_temp_files()
             st.success("✅ Files cleared and temporary files cleaned up")
             st.rerun()
-    
-    # Extraction execution
-    if st.session_state.selected_files:
+        
+        # Extraction execution
         st.markdown("**⚡ Run Extraction**")
         
         col1, col2, col3 = st.columns(3)
         
+        # Each metric box is a single element with its value inside the styled div
         with col1:
-            st.markdown('<div class="metric-container">', unsafe_allow_html=True)
-            st.metric("Documents", len(st.session_state.selected_files))
-            st.markdown('</div>', unsafe_allow_html=True)
+            st.markdown(f'<div class="metric-container">Documents<br><b>{file_count}</b></div>', unsafe_allow_html=True)
         
         with col2:
-            st.markdown('<div class="metric-container">', unsafe_allow_html=True)
-            st.metric("Fields", len(st.session_state.fields))
-            st.markdown('</div>', unsafe_allow_html=True)
+            st.markdown(f'<div class="metric-container">Fields<br><b>{len(st.session_state.fields)}</b></div>', unsafe_allow_html=True)
         
         with col3:
-            st.markdown('<div class="metric-container">', unsafe_allow_html=True)
-            st.metric("Model", st.session_state.main_model_name or "Not set")
-            st.markdown('</div>', unsafe_allow_html=True)
+            model_name = html.escape(st.session_state.main_model_name or "Not set")
+            st.markdown(f'<div class="metric-container">Model<br><b>{model_name}</b></div>', unsafe_allow_html=True)
         
         # Rebuild models checkbox
         st.session_state.rebuild_models = st.checkbox(
@@ -1091,6 +1216,9 @@ def run_extraction():
             st.error("🚨 Extraction or Generation model is not selected or configured properly. Check your .env file and settings.")
             return
 
+        from model_generator import ModelGenerator
+        from document_parser import DocumentParser
+        
         # Initialize components with model selections and API config
         # Pass API config for OpenAI model generation when Azure is enabled
         if model_generation_model and 'gpt' in model_generation_model.lower() and api_config.get('use_azure', False):
@@ -1102,9 +1230,11 @@ def run_extraction():
         # Initialize extractor based on extraction model selection
         if extraction_model and 'claude' in extraction_model.lower():
             # If Claude is selected for extraction (only when not using Azure)
+            from claude_extractor import ClaudeExtractor
             extractor = ClaudeExtractor(model_selection=extraction_model)
         else:
             # Use OpenAI for extraction
+            from openai_extractor import OpenAIExtractor
             extractor = OpenAIExtractor(api_config=api_config)
         
         # Generate models and prompts
@@ -1128,7 +1258,8 @@ def run_extraction():
             status_text.text(f"🔧 Generating new Pydantic models using {model_display_name}...")
             progress_bar.progress(10)
             try:
-                pydantic_model_class, model_code = model_generator.generate_models_from_config_data(config)
+                # Rebuilding is an explicit request for a new generation, so cached model code for this config is skipped
+                pydantic_model_class, model_code = model_generator.generate_models_from_config_data(config, refresh=True)
                 progress_bar.progress(20)
                 
                 status_text.text("💾 Saving generated models and prompts...")
@@ -1154,17 +1285,16 @@ def run_extraction():
             status_text.text("📂 Loading existing models from saved files...")
             progress_bar.progress(10)
             try:
-                if not os.path.exists(model_path) or not os.path.exists(prompt_path):
-                    progress_bar.progress(0)
-                    status_text.text("❌ Models not found")
-                    st.error(f"❌ Models not found for use case '{use_case_name}'. Please check 'Build/Rebuild models' to generate them first.")
-                    return
-                
-                # Load existing models and prompt
-                pydantic_model_class, extraction_prompt = model_generator.load_models_and_prompt(model_path, prompt_path)
+                # Load existing models and prompt; a missing file surfaces as FileNotFoundError rather than being checked for first
+                pydantic_model_class, extraction_prompt = model_generator.load_models_and_prompt(model_path, prompt_path, require_prompt=True)
                 progress_bar.progress(30)
                 
                 status_text.text("✅ Existing models loaded successfully")
+            except FileNotFoundError:
+                progress_bar.progress(0)
+                status_text.text("❌ Models not found")
+                st.error(f"❌ Models not found for use case '{use_case_name}'. Please check 'Build/Rebuild models' to generate them first.")
+                return
             except Exception as load_error:
                 progress_bar.progress(0)
                 status_text.text("❌ Failed to load existing models")
@@ -1175,18 +1305,22 @@ def run_extraction():
         # Step 2: Parse documents
         status_text.text("📄 Parsing documents...")
         progress_bar.progress(40)
-        parsed_documents = []
-        total_files = len(st.session_state.selected_files)
+        selected_files = list(st.session_state.selected_files)
+        total_files = len(selected_files)
+        parsed_slots = [None] * total_files
         
-        for i, file_path in enumerate(st.session_state.selected_files):
-            try:
-                status_text.text(f"📄 Parsing document {i+1}/{total_files}: {os.path.basename(file_path)}")
-                parsed_doc = document_parser.parse_document(file_path)
-                parsed_documents.append(parsed_doc)
-                # Update progress for parsing (40-60%)
-                progress_bar.progress(40 + int(20 * (i+1) / total_files))
-            except Exception as e:
-                st.warning(f"⚠️ Could not parse {os.path.basename(file_path)}: {str(e)}")
+        # Documents are parsed in parallel and reported as they finish; slots keep the selection order
+        for parsed_count, (i, parsed_doc, error) in enumerate(document_parser.iter_parse_documents(selected_files), start=1):
+            file_name = os.path.basename(selected_files[i])
+            if error is not None:
+                st.warning(f"⚠️ Could not parse {file_name}: {str(error)}")
+            else:
+                parsed_slots[i] = parsed_doc
+            status_text.text(f"📄 Parsed document {parsed_count}/{total_files}: {file_name}")
+            # Update progress for parsing (40-60%)
+            progress_bar.progress(40 + int(20 * parsed_count / total_files))
+        
+        parsed_documents = [parsed_doc for parsed_doc in parsed_slots if parsed_doc is not None]
         
         if not parsed_documents:
             progress_bar.progress(0)
@@ -1217,27 +1351,19 @@ def run_extraction():
         # Save results 
         status_text.text("💾 Saving extraction results...")
         st.session_state.extraction_results = results
+        # Counted once here; the results page reads it on every rerun
+        st.session_state['_success_count'] = _count_successful(results)
+        # Keys the cached results table and downloads to this set of results
+        st.session_state['_results_token'] = uuid.uuid4().hex
         
         # Save results to use-case folder
         if results:
             try:
-                clean_data = []
-                for result in results:
-                    clean_result = {k: v for k, v in result.items() if not k.startswith('_')}
-                    for key, value in clean_result.items():
-                        if hasattr(value, 'value'):
-                            clean_result[key] = value.value
-                        elif isinstance(value, list):
-                            if value and hasattr(value[0], 'value'):
-                                clean_result[key] = '; '.join([item.value for item in value])
-                            else:
-                                clean_result[key] = '; '.join([str(item) for item in value])
-                    clean_data.append(clean_result)
-                
-                df = pd.DataFrame(clean_data)
+                columns, converters = _result_converters(results)
                 results_filename = f"extraction_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
                 results_path = get_use_case_path(use_case_name, results_filename)
-                df.to_excel(results_path, index=False, engine='openpyxl')
+                # Rows are flattened as the writer consumes them, so no cleaned copy of the whole batch is built
+                _write_results_xlsx(results_path, columns, _iter_flat_rows(results, converters))
                 
                 st.info(f"📁 Results also saved to: {results_path}")
             except Exception as save_error:
@@ -1253,8 +1379,7 @@ def run_extraction():
         progress_bar.progress(100)
         status_text.text("🎉 Extraction completed successfully!")
         
-        # Clear progress bar after a short delay
-        time.sleep(1)
+        # Clear progress bar; the rerun below shows the results straight away
         progress_bar.empty()
         status_text.empty()
         
@@ -1281,38 +1406,262 @@ def run_extraction():
             st.text("3. Keep field descriptions concise and clear")
             st.text("4. For enum fields, make sure categories are provided")
 
+def _count_successful(results: List[Dict[str, Any]]) -> int:
+    """Count the results whose extraction didn't fail"""
+    return sum(1 for result in results if not result.get('_document_metadata', {}).get('extraction_error'))
+
+_enum_value = attrgetter('value')
+
+def _enum_cell(value: Any) -> Any:
+    """Enum member as its value; anything else (such as a fallback 'n/a') as it is"""
+    return value.value if isinstance(value, Enum) else value
+
+def _list_cell(value: Any) -> Any:
+    """List as a '; ' separated string of its items or their enum values"""
+    if not isinstance(value, list):
+        return value
+    if value and isinstance(value[0], Enum):
+        return '; '.join(map(_enum_value, value))
+    return '; '.join(map(str, value))
+
+def _result_converters(results: List[Dict[str, Any]]) -> tuple[List[str], Dict[str, Any]]:
+    """Get the result columns (internal keys dropped) and the cell converter for each column that needs one"""
+    # The values are probed rather than the configured field types, since generated models rename the fields
+    # (e.g. "AI field" becomes ai_field); one pass collects the columns and picks a converter for each column from
+    # its first list or enum value, and a column stops being probed once it has one
+    columns = {}
+    converters = {}
+    for result in results:
+        for key, value in result.items():
+            if key.startswith('_'):
+                continue
+            columns[key] = None
+            if key not in converters:
+                if isinstance(value, list):
+                    converters[key] = _list_cell
+                elif isinstance(value, Enum):
+                    converters[key] = _enum_cell
+    return list(columns), converters
+
+def _iter_flat_rows(results: List[Dict[str, Any]], converters: Dict[str, Any]):
+    """Yield each result as a spreadsheet row, one at a time"""
+    for result in results:
+        row = {k: v for k, v in result.items() if not k.startswith('_')}
+        for key, convert in converters.items():
+            if key in row:
+                row[key] = convert(row[key])
+        yield row
+
+def _flatten_results(results: List[Dict[str, Any]]) -> tuple[List[str], List[Dict[str, Any]]]:
+    """Drop internal keys and flatten enum and list values into spreadsheet cells, returning the columns and rows"""
+    columns, converters = _result_converters(results)
+    return columns, list(_iter_flat_rows(results, converters))
+
+# Data rows per sheet of a results workbook; single sheets of hundreds of thousands of rows are slow to write and open
+_SHEET_ROWS = 50_000
+
+def _write_results_xlsx(path, columns: List[str], rows):
+    """Write result rows (a list or any iterable of dicts) to an xlsx file or buffer"""
+    _write_xlsx_rows(path, columns, ([row.get(key) for key in columns] for row in rows))
+
+def _write_xlsx_rows(path, columns: List[str], value_rows):
+    """Write rows of cell values to an xlsx file or buffer, streaming them with xlsxwriter when it is installed"""
+    try:
+        import xlsxwriter
+    except ImportError:
+        import pandas as pd
+        pd.DataFrame(list(value_rows), columns=columns).to_excel(path, index=False, engine='openpyxl')
+        return
+    
+    # constant_memory flushes each row to a temporary file once the next one starts, so memory stays flat however
+    # many rows there are; strings_to_urls is off so text cells skip the URL check
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'strings_to_urls': False})
+    worksheet = None
+    # Very large results are split over several sheets of _SHEET_ROWS rows, each with its own header
+    for index, values in enumerate(value_rows):
+        row_index = index % _SHEET_ROWS + 1
+        if row_index == 1:
+            worksheet = workbook.add_worksheet(f"Results_{index // _SHEET_ROWS + 1}")
+            worksheet.write_row(0, 0, columns)
+        worksheet.write_row(row_index, 0, [_excel_cell(value) for value in values])
+    if worksheet is None:
+        workbook.add_worksheet("Results_1").write_row(0, 0, columns)
+    workbook.close()
+
+def _excel_cell(value: Any) -> Any:
+    """Cell value xlsxwriter can write; anything it has no type for is written as text"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+# Document types picked up from a folder, in listing order
+_SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.doc')
+
+@st.cache_data(show_spinner=False, ttl=30, max_entries=16)
+def _scan_folder(folder_path: str, mtime_ns: int) -> List[str]:
+    """List the supported documents in a folder with one scandir pass; mtime_ns keys the cache"""
+    found = []
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            # Hidden files are skipped, as the glob patterns used to skip them
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            for rank, ext in enumerate(_SUPPORTED_EXTENSIONS):
+                if entry.name.endswith(ext):
+                    found.append((rank, entry.path))
+                    break
+    return [path for _, path in sorted(found)]
+
 def _cleanup_temp_files():
     """Clean up temporary files created during document upload"""
-    import os
-    import glob
-    
     try:
-        # Clean up temp files from uploaded documents
-        if hasattr(st.session_state, 'selected_files') and st.session_state.selected_files:
-            for file_path in st.session_state.selected_files:
-                if file_path and file_path.startswith("temp_") and os.path.exists(file_path):
-                    try:
-                        os.unlink(file_path)
-                        logger.info(f"Cleaned up temp file: {file_path}")
-                    except Exception as e:
-                        logger.warning(f"Could not clean up temp file {file_path}: {e}")
+        # Uploads are saved as temp_* in the project root, so one scan finds the selected ones and any orphans
+        with os.scandir('.') as entries:
+            temp_paths = [entry.path for entry in entries if entry.name.startswith("temp_") and entry.is_file()]
         
-        # Also clean up any orphaned temp_ files in the project root
-        temp_files = glob.glob("temp_*")
-        for temp_file in temp_files:
+        for temp_path in temp_paths:
             try:
-                if os.path.isfile(temp_file):
-                    os.unlink(temp_file)
-                    logger.info(f"Cleaned up orphaned temp file: {temp_file}")
+                os.unlink(temp_path)
+                logger.info(f"Cleaned up temp file: {temp_path}")
+            except FileNotFoundError:
+                pass
             except Exception as e:
-                logger.warning(f"Could not clean up orphaned temp file {temp_file}: {e}")
+                logger.warning(f"Could not clean up temp file {temp_path}: {e}")
             
         # Clear the selected files from session state
         st.session_state.selected_files = []
+        st.session_state.pop('_saved_uploads', None)
     
     except Exception as e:
         logger.error(f"Error during temp file cleanup: {e}")
 
+# Rows of the results table sent to the browser until the whole table is asked for
+_PREVIEW_ROWS = 500
+
+def _public_results(results_token: str, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Extracted fields of each result without the internal '_' keys, filtered once per set of results"""
+    # Kept in session state rather than st.cache_data, which would pickle the generated enum members
+    cached = st.session_state.get('_public_results')
+    if cached is not None and cached[0] == results_token:
+        return cached[1]
+    public_results = [{k: v for k, v in result.items() if not k.startswith('_')} for result in results]
+    st.session_state['_public_results'] = (results_token, public_results)
+    return public_results
+
+# The results token names one set of extraction results; the underscored arguments are not hashed
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _results_frame(results_token: str, _public: List[Dict[str, Any]]):
+    """Results table for display and download, with enum and list cells flattened to text and empty cells as 'n/a'"""
+    # Imported on first use so pages without results don't pay for pandas at startup
+    import pandas as pd
+    
+    # Converters are picked once per column by probing its values; a first value can be a failed document's 'n/a'
+    columns, converters = _result_converters(_public)
+    # object dtype keeps the original values, so an int column with gaps isn't turned into floats
+    df = pd.DataFrame(_public, columns=columns, dtype=object)
+    for column in columns:
+        df[column] = df[column].map(converters.get(column, str), na_action='ignore')
+    df = df.fillna('n/a')
+    
+    # Columns of repeated values (enum fields, 'n/a' fallbacks) become categories, and the rest Arrow-backed
+    # strings, which convert to Arrow for the table and write out faster than Python string objects
+    category_limit = max(32, len(df) // 4)
+    for column in columns:
+        if df[column].nunique() < category_limit:
+            df[column] = df[column].astype('category')
+    return df.convert_dtypes(dtype_backend='pyarrow')
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _results_csv(results_token: str, _df) -> bytes:
+    """Results table as UTF-8 CSV, written by pyarrow's columnar CSV writer"""
+    try:
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+    except ImportError:
+        return _rows_to_csv(_df)
+    
+    try:
+        table = pa.Table.from_pandas(_df, preserve_index=False)
+        # Category columns arrive dictionary encoded; every cell is text, so all columns are written as strings
+        table = table.cast(pa.schema([pa.field(name, pa.string()) for name in table.column_names]))
+        csv_buffer = pa.BufferOutputStream()
+        pa_csv.write_csv(table, csv_buffer)
+        return csv_buffer.getvalue().to_pybytes()
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+        # A column that is not all text (such as non-string enum values next to 'n/a') has no Arrow string type
+        logger.warning(f"Writing the CSV download with the csv module: {e}")
+        return _rows_to_csv(_df)
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _results_parquet(results_token: str, _df) -> bytes:
+    """Results table as a zstd compressed Parquet file, with every column written as strings"""
+    import pyarrow as pa
+    from pyarrow import parquet as pa_parquet
+    
+    try:
+        table = pa.Table.from_pandas(_df, preserve_index=False)
+        table = table.cast(pa.schema([pa.field(name, pa.string()) for name in table.column_names]))
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+        # A column mixing non-string values with 'n/a' has no single Arrow type, so convert from the cells' text
+        logger.info(f"Converting results to text for Parquet: {e}")
+        table = pa.Table.from_pandas(_df.astype(str), preserve_index=False)
+    parquet_buffer = pa.BufferOutputStream()
+    pa_parquet.write_table(table, parquet_buffer, compression='zstd')
+    return parquet_buffer.getvalue().to_pybytes()
+
+def _rows_to_csv(df) -> bytes:
+    """Table as UTF-8 CSV written with the csv module"""
+    import csv
+    from io import BytesIO, TextIOWrapper
+    # The cells are already text, so the csv module writes the row tuples as they are, without to_csv's
+    # per-cell formatting; encoded straight into the buffer, so the whole CSV never exists as one str as well
+    csv_buffer = BytesIO()
+    with TextIOWrapper(csv_buffer, encoding='utf-8', newline='') as csv_text:
+        writer = csv.writer(csv_text)
+        writer.writerow(df.columns)
+        writer.writerows(df.itertuples(index=False, name=None))
+        csv_text.flush()
+        return csv_buffer.getvalue()
+
+# cache_resource hands back the stored bytes themselves, where cache_data would unpickle a copy of the workbook on
+# every rerun; the token alone identifies the results, so nothing is hashed either
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _results_xlsx(results_token: str, _df) -> bytes:
+    """Results table as an xlsx workbook"""
+    from io import BytesIO
+    excel_buffer = BytesIO()
+    _write_xlsx_rows(excel_buffer, list(_df.columns), _df.itertuples(index=False, name=None))
+    return excel_buffer.getvalue()
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _results_json(results_token: str, _public: List[Dict[str, Any]]) -> bytes:
+    """Extracted fields of each result as indented UTF-8 JSON"""
+    return json_utils.dumps_bytes(_public, indent=True, default=_json_default)
+
+def _json_default(value: Any) -> Any:
+    """JSON form of values the encoder has no type for: enum members as their value, anything else as text"""
+    # orjson writes enums itself; the standard library falls back to this for them
+    return value.value if isinstance(value, Enum) else str(value)
+
+def _download_payloads(results_token: str, df, public_results: List[Dict[str, Any]]) -> tuple:
+    """CSV, Excel, JSON and Parquet download data, left to the click where Streamlit defers it, else built side by side"""
+    builds = (
+        (_results_csv, results_token, df),
+        (_results_xlsx, results_token, df),
+        (_results_json, results_token, public_results),
+        (_results_parquet, results_token, df)
+    )
+    if _DEFERRED_DOWNLOADS:
+        return tuple(functools.partial(*build) for build in builds)
+    
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+    # The writers spend most of their time in pyarrow, xlsxwriter and orjson; the workers get this run's context
+    # so the Streamlit caches behave as they do on the main thread
+    with ThreadPoolExecutor(max_workers=len(builds), initializer=add_script_run_ctx, initargs=(None, get_script_run_ctx())) as executor:
+        futures = [executor.submit(*build) for build in builds]
+        return tuple(future.result() for future in futures)
+
 def display_results():
     """Display extraction results in a well-formatted box"""
     results = st.session_state.extraction_results
@@ -1321,123 +1670,116 @@ def display_results():
         st.warning("No results to display")
         return
     
-    # Create the results container
-    st.markdown('<div class="results-container">', unsafe_allow_html=True)
-    st.markdown('<div class="results-header">📊 Extraction Results</div>', unsafe_allow_html=True)
-    
-    # Results summary
-    st.markdown('<div class="result-summary">', unsafe_allow_html=True)
-    
-    # Summary metrics
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.metric("📄 Documents Processed", len(results))
-    
-    with col2:
-        successful_extractions = len([r for r in results if not r.get('_document_metadata', {}).get('extraction_error')])
-        st.metric("✅ Successful", successful_extractions)
-    
-    with col3:
-        failed_extractions = len(results) - successful_extractions
-        st.metric("❌ Failed", failed_extractions)
-    
-    with col4:
-        if results:
-            first_result = {k: v for k, v in results[0].items() if not k.startswith('_')}
-            st.metric("📊 Fields Extracted", len(first_result))
-    
-    st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Create clean DataFrame for display (only extracted fields)
-    clean_data = []
-    for i, result in enumerate(results):
-        clean_result = {}
+    # Create the results container; a bordered container holds the results, which a div opened in its own
+    # markdown element can't wrap
+    with st.container(border=True):
+        st.markdown('<div class="results-header">📊 Extraction Results</div>', unsafe_allow_html=True)
         
-        # Process extracted fields only
-        for key, value in result.items():
-            if not key.startswith('_'):
-                if hasattr(value, 'value'):  # Enum object
-                    clean_result[key] = value.value
-                elif isinstance(value, list):
-                    if value and hasattr(value[0], 'value'):  # List of enums
-                        clean_result[key] = '; '.join([item.value for item in value])
-                    else:  # List of strings
-                        clean_result[key] = '; '.join([str(item) for item in value])
-                else:
-                    clean_result[key] = str(value) if value is not None else 'n/a'
+        # Summary metrics
+        col1, col2, col3, col4 = st.columns(4)
         
-        clean_data.append(clean_result)
-    
-    df = pd.DataFrame(clean_data)
-    
-    # Display the data table with enhanced formatting
-    st.markdown("### 📋 Extracted Data")
-    
-    # Show extracted data table
-    st.dataframe(
-        df, 
-        use_container_width=True,
-        hide_index=True
-    )
-    
-    if len(results) > 10:
-        st.info(f"Showing all {len(results)} documents processed.")
-    
-    # Download section
-    st.markdown('<div class="download-container">', unsafe_allow_html=True)
-    st.markdown("### 💾 Download Results")
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        # CSV download
-        csv_data = df.to_csv(index=False)
-        st.download_button(
-            "📥 CSV Format",
-            data=csv_data,
-            file_name=f"{st.session_state.use_case.replace(' ', '_').lower()}_results.csv",
-            mime="text/csv",
-            use_container_width=True
-        )
-    
-    with col2:
-        # Excel download
-        excel_buffer = BytesIO()
-        df.to_excel(excel_buffer, index=False, engine='openpyxl')
-        excel_buffer.seek(0)
-        
-        st.download_button(
-            "📊 Excel Format",
-            data=excel_buffer.getvalue(),
-            file_name=f"{st.session_state.use_case.replace(' ', '_').lower()}_results.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            use_container_width=True
-        )
-    
-    with col3:
-        # JSON download
-        json_data = json.dumps([{k: v for k, v in result.items() if not k.startswith('_')} for result in results], indent=2, default=str)
-        st.download_button(
-            "📋 JSON Format",
-            data=json_data,
-            file_name=f"{st.session_state.use_case.replace(' ', '_').lower()}_results.json",
-            mime="application/json",
-            use_container_width=True
+        with col1:
+            st.metric("📄 Documents Processed", len(results))
+        
+        with col2:
+            successful_extractions = st.session_state.get('_success_count')
+            if successful_extractions is None:
+                successful_extractions = st.session_state['_success_count'] = _count_successful(results)
+            st.metric("✅ Successful", successful_extractions)
+        
+        with col3:
+            failed_extractions = len(results) - successful_extractions
+            st.metric("❌ Failed", failed_extractions)
+        
+        # The table and downloads are built once per set of results, not on every rerun
+        results_token = st.session_state.get('_results_token')
+        if results_token is None:
+            results_token = st.session_state['_results_token'] = uuid.uuid4().hex
+        public_results = _public_results(results_token, results)
+        df = _results_frame(results_token, public_results)
+        
+        with col4:
+            # The cached table's header already lists the extracted fields
+            st.metric("📊 Fields Extracted", len(df.columns))
+        
+        # Display the data table with enhanced formatting
+        st.markdown("### 📋 Extracted Data")
+        
+        # Show extracted data table; large results send their first rows unless the whole table is asked for,
+        # since every rerun ships the displayed rows to the browser
+        show_all = len(df) <= _PREVIEW_ROWS or st.toggle(f"Show all {len(df)} documents", key="show_all_results")
+        st.dataframe(
+            df if show_all else df.head(_PREVIEW_ROWS), 
+            use_container_width=True,
+            hide_index=True,
+            height=400
         )
-    
-    with col4:
-        # Clear results
-        if st.button("🔄 New Extraction", use_container_width=True):
-            st.session_state.extraction_results = None
-            st.rerun()
-    
-    st.markdown('</div>', unsafe_allow_html=True)
-    st.markdown('</div>', unsafe_allow_html=True)
+        
+        if not show_all:
+            st.info(f"Showing the first {_PREVIEW_ROWS} of {len(results)} documents processed. The downloads include all of them.")
+        elif len(results) > 10:
+            st.info(f"Showing all {len(results)} documents processed.")
+        
+        # Download section
+        st.markdown("### 💾 Download Results")
+        
+        col1, col2, col3, col4, col5 = st.columns(5)
+        file_slug = st.session_state.use_case.replace(' ', '_').lower()
+        csv_data, excel_data, json_data, parquet_data = _download_payloads(results_token, df, public_results)
+        
+        with col1:
+            # CSV download
+            st.download_button(
+                "📥 CSV Format",
+                data=csv_data,
+                file_name=f"{file_slug}_results.csv",
+                mime="text/csv",
+                use_container_width=True
+            )
+        
+        with col2:
+            # Excel download
+            st.download_button(
+                "📊 Excel Format",
+                data=excel_data,
+                file_name=f"{file_slug}_results.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                use_container_width=True
+            )
+        
+        with col3:
+            # JSON download
+            st.download_button(
+                "📋 JSON Format",
+                data=json_data,
+                file_name=f"{file_slug}_results.json",
+                mime="application/json",
+                use_container_width=True
+            )
+        
+        with col4:
+            # Parquet download, compact and quick to load back into pandas or Spark
+            st.download_button(
+                "⚡ Parquet (fast)",
+                data=parquet_data,
+                file_name=f"{file_slug}_results.parquet",
+                mime="application/octet-stream",
+                use_container_width=True
+            )
+        
+        with col5:
+            # Clear results
+            if st.button("🔄 New Extraction", use_container_width=True):
+                st.session_state.extraction_results = None
+                st.session_state.pop('_success_count', None)
+                st.session_state.pop('_results_token', None)
+                st.session_state.pop('_public_results', None)
+                st.rerun()
 
 def main():
     """Main UI function"""
     initialize_session_state()
+    inject_custom_css()
     
     # Ensure Use-cases folder exists at startup
     ensure_use_cases_folder()
@@ -1445,20 +1787,17 @@ def main():
     # Header
     st.markdown('<h1 class="main-header">🤖 Knowledge Extraction Agent</h1>', unsafe_allow_html=True)
     
-    # Navigation tabs
+    # Navigation tabs; the callbacks switch before the rerun, so the highlight and section below already match
     col1, col2 = st.columns(2)
     with col1:
         config_style = "primary" if st.session_state.current_tab == "Configuration" else "secondary"
-        if st.button("⚙️ Configuration", type=config_style, use_container_width=True):
-            st.session_state.current_tab = "Configuration"
-            st.rerun()
+        st.button("⚙️ Configuration", type=config_style, use_container_width=True,
+                  on_click=_switch_tab, args=("Configuration",))
     
     with col2:
         extraction_style = "primary" if st.session_state.current_tab == "Extraction" else "secondary"
-        if st.button("🎯 Extraction", type=extraction_style, use_container_width=True):
-            load_extraction_context_from_current_config()  # Load context before switching
-            st.session_state.current_tab = "Extraction"
-            st.rerun()
+        st.button("🎯 Extraction", type=extraction_style, use_container_width=True,
+                  on_click=_switch_tab, args=("Extraction",))
     
     st.markdown("---")
     
@@ -1469,7 +1808,4 @@ def main():
         extraction_section()
 
 if __name__ == "__main__":
-    # Add required import for Excel download
-    from io import BytesIO
-
     main()